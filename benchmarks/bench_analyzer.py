@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+
+"""
+Compares the scope-stack parser.Analyzer with the analyzer it replaced (one Analyzer per child
+statement and a print per import) on large generated modules, or on the .py files below --project.
+Both analyzers must produce the same tree. Standard output is sent to /dev/null while timing so the
+old analyzer's prints do not depend on the terminal. The two analyzers run alternately, each run starts
+after a full garbage collection and its result is dropped, so neither pays for the other's garbage.
+
+Usage: python benchmarks/bench_analyzer.py [--modules N] [--repeat N] [--project PATH]
+"""
+
+import argparse
+import ast
+import contextlib
+import gc
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.encoder import encode
+from src.nodes import *
+from src.parser import parse_node, set_class_component_type, set_func_component_type
+from synthetic import generate_module
+
+
+def legacy_parse_node(ast_node, node):
+    analyzer = LegacyAnalyzer(node)
+    analyzer.visit(ast_node)
+    return analyzer.module
+
+
+class LegacyAnalyzer(ast.NodeVisitor):
+    def __init__(self, module):
+        self.module = module
+
+    def visit_Import(self, ast_node):
+        print(self.module.name)
+        for alias in ast_node.names:
+            imp = PyImport()
+            imp.name = alias.name
+            self.module.imports.append(imp)
+
+    def visit_ImportFrom(self, ast_node):
+        for alias in ast_node.names:
+            imp = PyImport()
+            imp.name = alias.name
+            self.module.imports.append(imp)
+
+    def visit_ClassDef(self, ast_node):
+        node = PyClass()
+        node.name = ast_node.name
+
+        for base in ast_node.bases:
+            base_node = PyBase()
+
+            if isinstance(base, ast.Name):
+                base_node.name = base.id
+            elif isinstance(base, ast.Attribute):
+                base_node.name = base.value.id
+                base_node.value = base.attr
+
+            node.bases.append(base_node)
+
+        for ast_child_node in ast_node.body:
+            legacy_parse_node(ast_child_node, node)
+
+        set_class_component_type(node)
+        self.module.classes.append(node)
+
+    def visit_FunctionDef(self, ast_node):
+        node = PyFunction()
+        node.name = ast_node.name
+
+        for arg in ast_node.args.args:
+            node.args.append(arg.arg)
+
+        for ast_child_node in ast_node.body:
+            legacy_parse_node(ast_child_node, node)
+
+        set_func_component_type(node)
+        self.module.functions.append(node)
+
+    def visit_Call(self, ast_node):
+        node = PyCall()
+        func = ast_node.func
+
+        if isinstance(func, ast.Name):
+            node.func = func.id
+        elif isinstance(func, ast.Attribute):
+            node.func = func.attr
+
+        for arg in ast_node.args:
+            if isinstance(arg, ast.Name):
+                node.args.append(arg.id)
+            elif isinstance(arg, ast.Call):
+                call_dict = PyArgCall()
+                legacy_parse_node(arg, call_dict)
+                node.args.append(call_dict)
+            elif isinstance(arg, ast.Constant) and isinstance(arg.value, (int, float, complex)) \
+                    and not isinstance(arg.value, bool):
+                node.args.append(arg.value)
+            elif isinstance(arg, ast.Constant) and isinstance(arg.value, str):
+                node.args.append(arg.value)
+
+        for keyword in ast_node.keywords:
+            node.keywords.append(keyword.arg)
+
+        self.module.statements.append(node)
+
+    def visit_Name(self, ast_node):
+        node = PyName()
+        node.name = ast_node.id
+
+        ctx = ast_node.ctx
+        if isinstance(ctx, ast.Load):
+            node.statement_type = 'Load'
+        elif isinstance(ctx, ast.Store):
+            node.statement_type = 'Store'
+        elif isinstance(ctx, ast.Del):
+            node.statement_type = 'Del'
+
+        self.module.statements.append(node)
+
+
+def generated_trees(modules, seed=0):
+    # A few large modules, each made of many generated ones
+    rng = random.Random(seed)
+    sources = [''.join(generate_module(rng, index * 1000 + part) for part in range(modules)) for index in range(4)]
+    return [ast.parse(source) for source in sources]
+
+
+def project_trees(project_path):
+    trees = list()
+    for dir_path, dir_names, file_names in os.walk(project_path):
+        for file_name in file_names:
+            if file_name.endswith('.py'):
+                try:
+                    with open(os.path.join(dir_path, file_name), 'rb') as source:
+                        trees.append(ast.parse(source.read()))
+                except (SyntaxError, ValueError):
+                    continue
+    return trees
+
+
+def analyze_all(parse, trees):
+    return [parse(tree, PyModule()) for tree in trees]
+
+
+def timed(parse, trees):
+    gc.collect()
+    start = time.perf_counter()
+    analyze_all(parse, trees)
+    return time.perf_counter() - start
+
+
+def alternate(repeat, trees):
+    # Median timings of both analyzers, run in turns and starting with a different one each round
+    legacy_timings, current_timings = list(), list()
+    for round_index in range(repeat):
+        if round_index % 2:
+            current_timings.append(timed(parse_node, trees))
+            legacy_timings.append(timed(legacy_parse_node, trees))
+        else:
+            legacy_timings.append(timed(legacy_parse_node, trees))
+            current_timings.append(timed(parse_node, trees))
+    return sorted(legacy_timings)[repeat // 2], sorted(current_timings)[repeat // 2]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('--modules', type=int, default=200, help='generated modules per large module')
+    arg_parser.add_argument('--repeat', type=int, default=7)
+    arg_parser.add_argument('--project', help='analyze the .py files of a directory instead')
+    args = arg_parser.parse_args()
+
+    trees = project_trees(args.project) if args.project else generated_trees(args.modules)
+    nodes = sum(1 for tree in trees for _ in ast.walk(tree))
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        identical = [encode(module) for module in analyze_all(legacy_parse_node, trees)] == \
+                    [encode(module) for module in analyze_all(parse_node, trees)]
+        legacy_time, current_time = alternate(args.repeat, trees)
+
+    print('{} trees, {} AST nodes, identical output: {}'.format(len(trees), nodes, identical))
+    print('legacy:  {:8.2f} ms median  {:10.0f} nodes/s'.format(legacy_time * 1000, nodes / legacy_time))
+    print('current: {:8.2f} ms median  {:10.0f} nodes/s'.format(current_time * 1000, nodes / current_time))
+    print('speedup: {:.2f}x'.format(legacy_time / current_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+
+"""
+Compares the explicit-stack util.ast_walk with the recursive generator it replaced, on large
+generated modules, and times the type-filtered util.ast_walk_types.
+
+Usage: python benchmarks/bench_ast_walk.py [--modules N] [--depth N] [--repeat N]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+import astroid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.util import ast_walk, ast_walk_types
+from synthetic import generate_module
+
+
+def recursive_walk(root):
+    yield root
+    for node in root.get_children():
+        yield from recursive_walk(node)
+
+
+def best_of(repeat, func):
+    timings = list()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def consume(walker, *args):
+    return lambda: sum(1 for _ in walker(*args))
+
+
+def filtered_walk(root, types):
+    return (node for node in recursive_walk(root) if isinstance(node, types))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('--modules', type=int, default=200, help='generated modules concatenated into one')
+    arg_parser.add_argument('--depth', type=int, default=2000, help='nesting depth of the deep expression')
+    arg_parser.add_argument('--repeat', type=int, default=5)
+    args = arg_parser.parse_args()
+
+    rng = random.Random(0)
+    source = '\n'.join(generate_module(rng, index) for index in range(args.modules))
+    tree = astroid.parse(source)
+    nodes = sum(1 for _ in ast_walk(tree))
+    same = [id(node) for node in ast_walk(tree)] == [id(node) for node in recursive_walk(tree)]
+
+    print('module: {} lines, {} nodes, same order: {}'.format(source.count('\n'), nodes, same))
+    recursive_time = best_of(args.repeat, consume(recursive_walk, tree))
+    iterative_time = best_of(args.repeat, consume(ast_walk, tree))
+    filtered_time = best_of(args.repeat, consume(filtered_walk, tree, astroid.nodes.Call))
+    typed_time = best_of(args.repeat, consume(ast_walk_types, tree, astroid.nodes.Call))
+    print('  recursive ast_walk           {:8.1f} ms'.format(recursive_time * 1000))
+    print('  iterative ast_walk           {:8.1f} ms  {:.2f}x'.format(
+        iterative_time * 1000, recursive_time / iterative_time))
+    print('  recursive walk + isinstance  {:8.1f} ms'.format(filtered_time * 1000))
+    print('  ast_walk_types               {:8.1f} ms  {:.2f}x'.format(
+        typed_time * 1000, filtered_time / typed_time))
+
+    # A long chain of additions nests the tree as deep as the chain is long
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(max(limit, args.depth * 10))
+    deep_tree = astroid.parse('value = ' + ' + '.join(['x'] * args.depth))
+    sys.setrecursionlimit(limit)
+
+    print('deep expression: depth {}'.format(args.depth))
+    try:
+        sum(1 for _ in recursive_walk(deep_tree))
+        print('  recursive ast_walk  ok')
+    except RecursionError:
+        print('  recursive ast_walk  RecursionError')
+    print('  iterative ast_walk  ok, {} nodes'.format(sum(1 for _ in ast_walk(deep_tree))))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+
+"""
+Measures the memory held by a parsed system with the __slots__ node classes of src/nodes.py
+against the same tree built from plain, dict-backed classes.
+
+Usage: python benchmarks/bench_node_memory.py [--services N] [--packages N] [--modules N]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.cache import configure_cache
+from src.nodes import Node
+from src.parser import parse_source_file
+from synthetic import generate_project
+
+dict_classes = dict()
+
+
+def dict_class(cls):
+    # Plain class with the same name and fields as a slotted node class
+    if cls not in dict_classes:
+        dict_classes[cls] = type(cls.__name__, (), {})
+    return dict_classes[cls]
+
+
+def copy_tree(value, compact):
+    if isinstance(value, list):
+        return [copy_tree(item, compact) for item in value]
+    if not isinstance(value, Node):
+        return value
+
+    node = type(value).__new__(type(value)) if compact else dict_class(type(value))()
+    for key, item in value.__getstate__().items():
+        setattr(node, key, copy_tree(item, compact))
+    return node
+
+
+def count_nodes(value):
+    if isinstance(value, list):
+        return sum(count_nodes(item) for item in value)
+    if not isinstance(value, Node):
+        return 0
+    return 1 + sum(count_nodes(item) for item in value.__getstate__().values())
+
+
+def retained_memory(system, compact):
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    tree = copy_tree(system, compact)
+    size = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    del tree
+    return size
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('--services', type=int, default=4)
+    arg_parser.add_argument('--packages', type=int, default=10)
+    arg_parser.add_argument('--modules', type=int, default=50)
+    args = arg_parser.parse_args()
+
+    configure_cache(enabled=False)
+    with tempfile.TemporaryDirectory() as project_path:
+        files = generate_project(project_path, args.services, args.packages, args.modules)
+        system = parse_source_file(project_path)
+
+    nodes = count_nodes(system)
+    dict_size = retained_memory(system, compact=False)
+    slots_size = retained_memory(system, compact=True)
+
+    print('files: {}, nodes: {}'.format(files, nodes))
+    print('dict-backed nodes: {:.1f} MiB ({:.0f} B/node)'.format(dict_size / 2 ** 20, dict_size / nodes))
+    print('slotted nodes:     {:.1f} MiB ({:.0f} B/node)'.format(slots_size / 2 ** 20, slots_size / nodes))
+    print('reduction:         {:.1f}%'.format(100 * (1 - slots_size / dict_size)))
+
+
+if __name__ == '__main__':
+    main()
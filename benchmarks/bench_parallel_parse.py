@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+
+"""
+Compares serial and process-pool parsing of a project with parse_source_file.
+
+Usage: python benchmarks/bench_parallel_parse.py <project_path> [--workers N] [--repeat N]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import jsonpickle
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.cache import configure_cache
+from src.parser import parse_source_file
+from src.registry import module_cache
+
+
+def best_of(repeat, func, *args, **kwargs):
+    timings = list()
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('project_path')
+    arg_parser.add_argument('--workers', type=int, default=os.cpu_count())
+    arg_parser.add_argument('--chunk-size', type=int, default=None)
+    arg_parser.add_argument('--repeat', type=int, default=3)
+    args = arg_parser.parse_args()
+
+    # Every run has to do the full work: no parse cache and no process wide astroid trees. Workers read
+    # the module cache setting from the environment
+    configure_cache(enabled=False)
+    module_cache.enabled = False
+    os.environ['PYPARSER_MODULE_CACHE'] = 'off'
+
+    serial_time, serial = best_of(args.repeat, parse_source_file, args.project_path)
+    parallel_time, parallel = best_of(args.repeat, parse_source_file, args.project_path,
+                                      workers=args.workers, chunk_size=args.chunk_size)
+
+    same = jsonpickle.encode(serial, unpicklable=False) == jsonpickle.encode(parallel, unpicklable=False)
+    print('serial:   {:.3f}s'.format(serial_time))
+    print('parallel: {:.3f}s ({} workers)'.format(parallel_time, args.workers))
+    print('speedup:  {:.2f}x'.format(serial_time / parallel_time))
+    print('identical output: {}'.format(same))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+
+"""
+Compares src.encoder against jsonpickle on trees rebuilt from docs/parser.json and docs/interface.json.
+
+Usage: python benchmarks/bench_serializer.py [--copies N] [--repeat N]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import jsonpickle
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.encoder import encode, orjson
+from src.nodes import *
+
+parse_classes = {
+    'system': lambda data: PySystem(data['name']),
+    'app': lambda data: PyApp(data['name']),
+    'package': lambda data: PyPackage(),
+    'module': lambda data: PyModule(),
+    'import': lambda data: PyImport(),
+    'class': lambda data: PyClass(),
+    'base_class': lambda data: PyBase(),
+    'function': lambda data: PyFunction(),
+    'statement_function_call': lambda data: PyCall(),
+    'statement_assign': lambda data: PyName(),
+    'arg_call': lambda data: PyArgCall(),
+}
+
+
+def build_parse_node(data):
+    if isinstance(data, list):
+        return [build_parse_node(item) for item in data]
+    if not isinstance(data, dict) or 'type' not in data:
+        return data
+
+    node = parse_classes[data['type']](data)
+    for key, value in data.items():
+        setattr(node, key, build_parse_node(value))
+    return node
+
+
+def build_payload(data):
+    if not isinstance(data, dict):
+        return data
+    payload = Payload()
+    payload.__dict__.update(data)
+    return payload
+
+
+def build_point(data):
+    point = Point()
+    point.__dict__.update(data)
+    point.payload = [build_payload(item) for item in data['payload']]
+    point.response = build_payload(data['response'])
+    return point
+
+
+def build_interface_system(data):
+    system = System()
+    system.name = data['name']
+    for interface_data in data['interfaces']:
+        interface = Interface(interface_data['name'])
+        interface.end_points = [build_point(point) for point in interface_data['end_points']]
+        interface.exit_points = [build_point(point) for point in interface_data['exit_points']]
+        system.interfaces.append(interface)
+    return system
+
+
+def best_of(repeat, func, *args):
+    timings = list()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def compare(label, tree, repeat):
+    reference = jsonpickle.encode(tree, unpicklable=False)
+    identical = encode(tree) == reference
+
+    results = [('jsonpickle', best_of(repeat, jsonpickle.encode, tree, False))]
+    results.append(('encoder/json', best_of(repeat, encode, tree)))
+    if orjson is not None:
+        results.append(('encoder/orjson', best_of(repeat, encode, tree, 'orjson')))
+
+    print('{} ({:.1f} KiB, byte-identical: {})'.format(label, len(reference) / 1024, identical))
+    for name, timing in results:
+        print('  {:<16} {:8.2f} ms  {:5.1f}x'.format(name, timing * 1000, results[0][1] / timing))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('--copies', type=int, default=1, help='repeat the apps/interfaces to grow the trees')
+    arg_parser.add_argument('--repeat', type=int, default=20)
+    args = arg_parser.parse_args()
+
+    with open(os.path.join(ROOT, 'docs', 'parser.json')) as source:
+        parser_data = json.load(source)
+    parser_data['apps'] = parser_data['apps'] * args.copies
+    with open(os.path.join(ROOT, 'docs', 'interface.json')) as source:
+        interface_data = json.load(source)
+    interface_data['interfaces'] = interface_data['interfaces'] * args.copies
+
+    compare('/parse', build_parse_node(parser_data), args.repeat)
+    compare('/interface', build_interface_system(interface_data), args.repeat)
+
+
+if __name__ == '__main__':
+    main()
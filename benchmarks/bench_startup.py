@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+
+"""
+Cold start of the Flask app: every run is a fresh interpreter that imports src.app under
+`python -X importtime` and answers one request with the test client. Prints the median import time
+of src.app and of its heaviest dependencies, and the time to the first response of each endpoint,
+measured from the start of the process.
+
+Usage: python benchmarks/bench_startup.py [--project PATH] [--repeat N] [--top N]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that used to be imported with the app, reported when a run loads them
+WATCHED = ('flask', 'astroid', 'jsonpickle', 'src.parser', 'src.interface', 'src.jobs', 'src.batch',
+           'concurrent.futures.process', 'pstats')
+
+# Runs in the child: imports the app and sends a single request
+CHILD = '''
+import json, sys, time
+start = time.perf_counter()
+from src.app import app
+imported = time.perf_counter()
+client = app.test_client()
+method, url, body = sys.argv[1], sys.argv[2], json.loads(sys.argv[3])
+response = client.open(url, method=method, json=body)
+done = time.perf_counter()
+print(json.dumps({'status': response.status_code, 'import': imported - start, 'request': done - imported}))
+'''
+
+ENDPOINTS = (
+    ('GET', '/', None),
+    ('GET', '/language', 'fileName'),
+    ('POST', '/parse', 'fileName'),
+    ('POST', '/interface', 'fileName'),
+)
+
+
+def import_times(stderr):
+    # -X importtime lines: "import time: self [us] | cumulative | imported package"
+    times = dict()
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_time, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = (int(self_time) / 1e6, int(cumulative) / 1e6)
+    return times
+
+
+def run_child(method, url, body):
+    start = time.perf_counter()
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', CHILD, method, url, json.dumps(body)],
+                               cwd=ROOT, capture_output=True, text=True, check=True)
+    wall = time.perf_counter() - start
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result['wall'] = wall
+    return result, import_times(completed.stderr)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--project', default=os.path.join(ROOT, 'sample'), help='project sent to the endpoints')
+    arg_parser.add_argument('--repeat', type=int, default=5)
+    arg_parser.add_argument('--top', type=int, default=10, help='slowest modules to list')
+    args = arg_parser.parse_args()
+
+    print('python {}, {} runs per endpoint, project {}'.format(sys.version.split()[0], args.repeat, args.project))
+    for method, url, argument in ENDPOINTS:
+        body = {argument: args.project} if argument else None
+        runs = [run_child(method, url, body) for _ in range(args.repeat)]
+        results = [result for result, _ in runs]
+        print('\n{} {} (status {})'.format(method, url, results[0]['status']))
+        print('  import src.app      {:8.1f} ms'.format(statistics.median(r['import'] for r in results) * 1000))
+        print('  first request       {:8.1f} ms'.format(statistics.median(r['request'] for r in results) * 1000))
+        print('  time to response    {:8.1f} ms  (process start to exit)'.format(
+            statistics.median(r['wall'] for r in results) * 1000))
+
+        modules = runs[-1][1]
+        loaded = [name for name in WATCHED if name in modules]
+        for name in loaded:
+            cumulative = statistics.median(times[name][1] for _, times in runs if name in times)
+            print('  {:<26} {:8.1f} ms'.format(name, cumulative * 1000))
+
+        if url == '/':
+            slowest = sorted(modules.items(), key=lambda item: item[1][0], reverse=True)[:args.top]
+            print('  slowest modules (self time):')
+            for name, (self_time, _) in slowest:
+                print('    {:<40} {:8.2f} ms'.format(name, self_time * 1000))
+
+
+if __name__ == '__main__':
+    main()
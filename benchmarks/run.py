@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+
+"""
+End to end benchmark of parse_source_file, system_interfaces and the JSON encoding on a generated
+Django microservice corpus (or an existing project). Throughput, peak RSS and latency percentiles
+are written to a results JSON; --compare prints the change against an earlier results file.
+
+Usage: python benchmarks/run.py [--services N] [--apps N] [--views N] [--modules N] [--calls N]
+                                [--repeat N] [--warmup N] [--workers N] [--projection P] [--project PATH]
+                                [--output FILE] [--compare FILE]
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.cache import configure_cache
+from src.discovery import discover
+from src.encoder import encode
+from src.interface import system_interfaces
+from src.parser import parse_source_file, PROJECTIONS
+from src.registry import module_cache
+from synthetic import generate_django_project
+
+
+def percentile(timings, fraction):
+    ordered = sorted(timings)
+    position = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[position]
+
+
+def peak_rss_kib():
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def measure(repeat, func, warmup=1):
+    # The warmup runs (astroid loads its brain plugins on first use) are not recorded
+    for _ in range(warmup):
+        func()
+    timings = list()
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return timings, result
+
+
+def summarize(timings, files, size):
+    median = percentile(timings, 0.5)
+    return {
+        'runs': len(timings),
+        'min': min(timings),
+        'p50': median,
+        'p90': percentile(timings, 0.9),
+        'p99': percentile(timings, 0.99),
+        'max': max(timings),
+        'files_per_s': files / median if median else None,
+        'mb_per_s': size / median / 1e6 if median else None,
+        'peak_rss_kib': peak_rss_kib(),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(project_path, repeat, workers, warmup, projection='full'):
+    files = list(discover(project_path).files('.py'))
+    size = sum(entry.size for entry in files)
+
+    stages = dict()
+    timings, system = measure(repeat, lambda: parse_source_file(project_path, workers=workers, projection=projection), warmup)
+    stages['parse'] = summarize(timings, len(files), size)
+    timings, _ = measure(repeat, lambda: encode(system), warmup)
+    stages['encode_parse'] = summarize(timings, len(files), size)
+
+    timings, interfaces = measure(repeat, lambda: system_interfaces(project_path, workers=workers), warmup)
+    stages['interface'] = summarize(timings, len(files), size)
+    timings, _ = measure(repeat, lambda: encode(interfaces), warmup)
+    stages['encode_interface'] = summarize(timings, len(files), size)
+
+    return {'files': len(files), 'bytes': size}, stages
+
+
+def compare(results, previous_file):
+    with open(previous_file) as source:
+        previous = json.load(source)
+    print('\ncompared to {} ({}):'.format(previous_file, previous.get('commit')))
+    for name, stage in results['stages'].items():
+        before = previous.get('stages', {}).get(name)
+        if before:
+            print('  {:<18} p50 {:8.2f} ms -> {:8.2f} ms  {:+6.1f}%'.format(
+                name, before['p50'] * 1000, stage['p50'] * 1000, (stage['p50'] / before['p50'] - 1) * 100))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--services', type=int, default=4)
+    arg_parser.add_argument('--apps', type=int, default=3)
+    arg_parser.add_argument('--views', type=int, default=20)
+    arg_parser.add_argument('--modules', type=int, default=10)
+    arg_parser.add_argument('--calls', type=int, default=2, help='requests calls per view')
+    arg_parser.add_argument('--seed', type=int, default=0)
+    arg_parser.add_argument('--repeat', type=int, default=5)
+    arg_parser.add_argument('--warmup', type=int, default=1, help='unrecorded runs before each stage')
+    arg_parser.add_argument('--workers', type=int, default=None)
+    arg_parser.add_argument('--projection', default='full', choices=PROJECTIONS, help='parse projection')
+    arg_parser.add_argument('--project', help='benchmark an existing project instead of a generated one')
+    arg_parser.add_argument('--output', help='results file, defaults to benchmarks/results/<time>.json')
+    arg_parser.add_argument('--compare', help='earlier results file to compare with')
+    args = arg_parser.parse_args()
+
+    # Every run has to do the full work: no parse cache and no process wide astroid trees
+    configure_cache(enabled=False)
+    module_cache.enabled = False
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        corpus = {'project': args.project}
+        project_path = args.project
+        if project_path is None:
+            project_path = os.path.join(temp_dir, 'corpus')
+            generate_django_project(project_path, args.services, args.apps, args.views, args.modules,
+                                    args.calls, args.seed)
+            corpus = {'services': args.services, 'apps': args.apps, 'views': args.views,
+                      'modules': args.modules, 'calls': args.calls, 'seed': args.seed}
+        size, stages = run(project_path, args.repeat, args.workers, args.warmup, args.projection)
+        corpus.update(size)
+
+    results = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'workers': args.workers,
+        'repeat': args.repeat,
+        'projection': args.projection,
+        'corpus': corpus,
+        'stages': stages,
+    }
+
+    output = args.output
+    if output is None:
+        output = os.path.join(ROOT, 'benchmarks', 'results', time.strftime('%Y%m%d-%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as target:
+        json.dump(results, target, indent=2, sort_keys=True)
+
+    print('corpus: {} files, {:.2f} MB'.format(corpus['files'], corpus['bytes'] / 1e6))
+    for name, stage in stages.items():
+        print('  {:<18} p50 {:8.2f} ms  p90 {:8.2f} ms  {:8.1f} files/s  {:6.2f} MB/s  rss {:,} KiB'.format(
+            name, stage['p50'] * 1000, stage['p90'] * 1000, stage['files_per_s'], stage['mb_per_s'],
+            stage['peak_rss_kib']))
+    print('results written to {}'.format(output))
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
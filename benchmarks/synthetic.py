@@ -0,0 +1,167 @@
+"""
+Generates synthetic Python projects of configurable size for the benchmarks.
+"""
+
+import os
+import random
+
+MODULE_TEMPLATE = '''import os
+import json
+from collections import OrderedDict
+
+
+class {class_name}(object):
+    limit = {number}
+
+    def __init__(self, name, values):
+        self.name = name
+        self.values = values
+
+    def total(self, factor):
+        result = 0
+        for value in self.values:
+            result = result + value * factor
+        return min(result, self.limit)
+
+    def dump(self, path):
+        data = OrderedDict(name=self.name, total=self.total(2))
+        with open(os.path.join(path, self.name), 'w') as target:
+            json.dump(data, target)
+
+
+def {function_name}(items, key):
+    selected = [item for item in items if item.name == key]
+    counts = dict()
+    for item in selected:
+        counts[item.name] = counts.get(item.name, 0) + item.total(1)
+    print('selected', len(selected), sorted(counts))
+    return {class_name}(key, list(counts.values()))
+'''
+
+
+def generate_module(rng, index):
+    return MODULE_TEMPLATE.format(
+        class_name='Model{}'.format(index),
+        function_name='build_{}'.format(index),
+        number=rng.randint(1, 1000),
+    )
+
+
+def generate_project(path, services=4, packages=5, modules=20, seed=0):
+    # Lays out services/<service>/<package>/<module>.py and returns the number of files written
+    rng = random.Random(seed)
+    written = 0
+    for service in range(services):
+        for package in range(packages):
+            package_path = os.path.join(path, 'service_{}'.format(service), 'package_{}'.format(package))
+            os.makedirs(package_path, exist_ok=True)
+            for module in range(modules):
+                with open(os.path.join(package_path, 'module_{}.py'.format(module)), 'w') as target:
+                    target.write(generate_module(rng, module))
+                written += 1
+    return written
+
+
+MANAGE_TEMPLATE = '''#!/usr/bin/env python
+import os
+import sys
+
+if __name__ == '__main__':
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', '{project}.settings')
+    from django.core.management import execute_from_command_line
+    execute_from_command_line(sys.argv)
+'''
+
+SETTINGS_TEMPLATE = '''import os
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SECRET_KEY = '{secret}'
+DEBUG = False
+INSTALLED_APPS = ['django.contrib.admin', 'rest_framework'{apps}]
+ROOT_URLCONF = '{project}.urls'
+WSGI_APPLICATION = '{project}.wsgi.application'
+'''
+
+VIEW_TEMPLATE = '''
+
+@api_view(http_method_names=['{method}'])
+def {name}(request):
+    payload = request.data
+{calls}    return Response({{'view': '{name}', 'items': len(payload)}})
+'''
+
+# One call shape per HTTP method: formatted query, gateway prefix with a payload, json payload and
+# a concatenated url
+CALL_TEMPLATES = {
+    'GET': "    res = requests.get('http://{host}/{route}?id=%s' % payload.get('id'))\n",
+    'POST': "    requests.post('http://{host}/api/v1/{route}', data={{'id': payload.get('id'), 'source': '{name}'}})\n",
+    'PUT': "    res = requests.put('http://{host}/{route}', json={{'value': 1}})\n",
+    'DELETE': "    requests.delete('http://{host}/' + '{route}')\n",
+}
+
+
+def service_routes(service, apps, views):
+    # (route, method) of every view of a service, in urlconf order
+    routes = list()
+    for app in range(apps):
+        for view in range(views):
+            method = ('GET', 'POST', 'PUT', 'DELETE')[view % 4]
+            routes.append(('service_{}/app_{}/view_{}/'.format(service, app, view), method))
+    return routes
+
+
+def generate_django_project(path, services=4, apps=2, views=10, modules=5, calls=2, seed=0):
+    # Lays out services/<service>/{manage.py, project/, app_<n>/} Django services whose views call each
+    # other's end points with requests, returns the number of files written
+    rng = random.Random(seed)
+    written = 0
+    routes = {service: service_routes(service, apps, views) for service in range(services)}
+
+    def write(file_path, content):
+        nonlocal written
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, 'w') as target:
+            target.write(content)
+        written += 1
+
+    for service in range(services):
+        root = os.path.join(path, 'service_{}'.format(service))
+        project = 'project'
+        app_names = ['app_{}'.format(app) for app in range(apps)]
+
+        write(os.path.join(root, 'manage.py'), MANAGE_TEMPLATE.format(project=project))
+        write(os.path.join(root, project, '__init__.py'), '')
+        write(os.path.join(root, project, 'settings.py'), SETTINGS_TEMPLATE.format(
+            project=project, secret=rng.getrandbits(64), apps=''.join(", '{}'".format(app) for app in app_names)))
+        write(os.path.join(root, project, 'wsgi.py'),
+              'from django.core.wsgi import get_wsgi_application\napplication = get_wsgi_application()\n')
+        write(os.path.join(root, project, 'urls.py'),
+              'from django.urls import path, include\n\nurlpatterns = [\n' +
+              ''.join("    path('service_{0}/{1}/', include('{1}.urls')),\n".format(service, app)
+                      for app in app_names) + ']\n')
+
+        for app, app_name in enumerate(app_names):
+            app_path = os.path.join(root, app_name)
+            write(os.path.join(app_path, '__init__.py'), '')
+            write(os.path.join(app_path, 'urls.py'),
+                  'from django.urls import path\nfrom . import views\n\nurlpatterns = [\n' +
+                  ''.join("    path('view_{0}/', views.view_{0}, name='view_{0}'),\n".format(view)
+                          for view in range(views)) + ']\n')
+
+            source = ('from rest_framework.response import Response\n'
+                      'from rest_framework.decorators import api_view\nimport requests\n')
+            for view in range(views):
+                view_calls = ''
+                for _ in range(calls if services > 1 else 0):
+                    target = rng.choice([other for other in range(services) if other != service])
+                    route, method = rng.choice(routes[target])
+                    view_calls += CALL_TEMPLATES[method].format(
+                        host='service-{}:8000'.format(target), route=route, name='view_{}'.format(view))
+                source += VIEW_TEMPLATE.format(method=('GET', 'POST', 'PUT', 'DELETE')[view % 4],
+                                               name='view_{}'.format(view), calls=view_calls)
+            write(os.path.join(app_path, 'views.py'), source)
+
+            for module in range(modules):
+                write(os.path.join(app_path, 'module_{}.py'.format(module)), generate_module(rng, module))
+
+    return written
@@ -5,17 +5,72 @@ Project Interface.
 Provides controller endpoints to various functionalities into the application.
 """
 
-import jsonpickle
+import json
+import time
+from contextlib import nullcontext
+from functools import wraps
 from flask import Flask
 from flask import request
-from src.parser import parse_source_file
-from src.interface import system_interfaces
-from src.languageDiscovery import getLanguage
+from src import metrics
 
+# Every endpoint imports the analysis modules it uses when it is first called, so that starting the app
+# (one short lived container per analysis) does not load astroid, the parser and the job machinery up front.
+# benchmarks/bench_startup.py tracks the import time and the time to the first response
 
 app = Flask(__name__)
 
 
+def measured(view):
+    # Records stage timings and counters of the request when PYPARSER_METRICS is on or the body has
+    # "metrics": true (returned in the X-PyParser-Metrics header); "profile": true adds a cProfile capture
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        request_data = request.get_json(silent=True) or {}
+        wanted = request_data.get('metrics') or request_data.get('profile')
+        if not (metrics.ENABLED or wanted):
+            return view(*args, **kwargs)
+
+        profile = None
+        if request_data.get('profile'):
+            profile = '{}-{}'.format(request.endpoint, time.strftime('%Y%m%d-%H%M%S'))
+        with metrics.collecting() as request_metrics:
+            with metrics.profiling(request_metrics, dump_name=profile) if profile else nullcontext():
+                with metrics.stage('request'):
+                    response = view(*args, **kwargs)
+
+        if response.is_streamed:
+            # The body is generated while it is sent, after the headers: its metrics only go to the
+            # totals of GET /metrics
+            response.response = measured_stream(response.response, request_metrics)
+            return response
+
+        request_metrics.add_count('requests')
+        metrics.process_metrics.merge(request_metrics)
+
+        if wanted:
+            response.headers['X-PyParser-Metrics'] = json.dumps(request_metrics.to_dict(files=5))
+        return response
+    return wrapper
+
+
+def measured_stream(chunks, request_metrics):
+    # Measures the generation of every chunk of a streamed body, the request is counted once it is sent
+    chunks = iter(chunks)
+    end = object()
+    try:
+        while True:
+            with metrics.collecting(request_metrics), metrics.stage('stream'):
+                chunk = next(chunks, end)
+            if chunk is end:
+                break
+            yield chunk
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+        request_metrics.add_count('requests')
+        metrics.process_metrics.merge(request_metrics)
+
+
 @app.route('/')
 def hello_world():
     # Handshake Endpoint
@@ -23,35 +78,221 @@ def hello_world():
 
 
 @app.route('/parse', methods=['POST'])
+@measured
 def parser():
     # Generates a parsed tree for a project
+    from src.parser import parse_source_file, iter_source_file, PROJECTIONS
+
     request_data = request.get_json()
-    results = parse_source_file(request_data['fileName'])
-    return app.response_class(
-        response=jsonpickle.encode(results, unpicklable=False),
-        status=200,
-        mimetype='application/json'
-    )
+    # "projection": "imports" | "structure" | "full" (default) selects how much of each module is extracted
+    projection = request_data.get('projection', 'full')
+    if projection not in PROJECTIONS:
+        return json_response({'error': 'Unknown projection, expected one of ' + ', '.join(PROJECTIONS)}, 400)
+
+    if request_data.get('stream'):
+        # Sends each module as a JSON line as soon as it is parsed
+        from src.encoder import stream_ndjson
+        return app.response_class(
+            response=stream_ndjson(iter_source_file(request_data['fileName'], projection=projection)),
+            status=200,
+            mimetype='application/x-ndjson'
+        )
+
+    if request_data.get('incremental'):
+        # Patches the snapshot kept from the previous call for this project (src.incremental loads astroid)
+        from src.incremental import incremental_parse
+        # Encoded while the snapshot is locked, the next incremental call patches it in place
+        return incremental_parse(request_data['fileName'], projection,
+                                 render=lambda results: results_response(results, request_data))
+
+    results = parse_source_file(request_data['fileName'], workers=request_data.get('workers'),
+                                projection=projection)
+    return results_response(results, request_data)
 
 
 @app.route('/language', methods=['GET'])
+@measured
 def langauge():
+    from src.languageDiscovery import getLanguage
+    from src.encoder import encode
+
     request_data = request.get_json()
     language = getLanguage(request_data['fileName'])
     return app.response_class(
-        response=jsonpickle.encode(language, unpicklable=False),
+        response=encode(language),
         status=200,
         mimetype='application/json'
     )
 
 
 @app.route('/interface', methods=['POST'])
+@measured
 def interface():
     # Generates interfaces for a project
+    from src.interface import system_interfaces
+    from src.incremental import incremental_interfaces
+
+    request_data = request.get_json()
+    if request_data.get('incremental'):
+        return incremental_interfaces(request_data['fileName'],
+                                      render=lambda results: results_response(results, request_data))
+
+    results = system_interfaces(request_data['fileName'], workers=request_data.get('workers'))
+    return results_response(results, request_data)
+
+
+@app.route('/graph', methods=['POST'])
+@measured
+def graph():
+    # Links the exit points of every service to the end points they call
+    from src.interface import system_interfaces
+    from src.incremental import incremental_interfaces
+    from src.graph import build_graph
+
     request_data = request.get_json()
-    results = system_interfaces(request_data['fileName'])
+    if request_data.get('incremental'):
+        # The graph is built while the snapshot is locked, its edges are new nodes
+        return results_response(incremental_interfaces(request_data['fileName'], render=build_graph), request_data)
+
+    system = system_interfaces(request_data['fileName'], workers=request_data.get('workers'))
+    return results_response(build_graph(system), request_data)
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics_summary():
+    # Totals of every measured request and the inference counters of the process;
+    # ?profile=1 includes the last cProfile capture
+    from src.inference import inferrer
+
+    summary = metrics.process_metrics.to_dict(files=20, profile=bool(request.args.get('profile')))
+    summary['inference'] = dict(inferrer.stats)
+    return json_response(summary)
+
+
+@app.route('/cache/modules', methods=['GET'])
+def module_cache_stats():
+    # Size, ceiling, hit/miss/eviction counters of the process wide astroid module cache
+    from src.registry import module_cache
+    return json_response(module_cache.to_dict())
+
+
+@app.route('/cache/modules', methods=['DELETE'])
+def clear_module_cache():
+    from src.registry import module_cache
+    module_cache.clear()
+    return json_response(module_cache.to_dict())
+
+
+@app.route('/snapshots', methods=['DELETE'])
+def clear_snapshots():
+    # Drops the incremental snapshots of {"fileName": ...}, or all of them without a body
+    from src.incremental import drop_snapshots, snapshots
+
+    request_data = request.get_json(silent=True) or {}
+    drop_snapshots(request_data.get('fileName'))
+    return json_response({'snapshots': len(snapshots)})
+
+
+@app.route('/batch', methods=['POST'])
+def batch():
+    # Analyses a list of projects in the shared batch pool, answering one JSON line per finished analysis.
+    # With "outputDir" results are written there and the lines only say where
+    from src.batch import iter_batch, check_batch
+    from src.encoder import encode_value, dumps
+
+    request_data = request.get_json()
+    kinds = request_data.get('kinds', ['parse', 'interface'])
+    output_format = request_data.get('format', 'json')
+    options = {'projection': request_data.get('projection', 'full')}
+    try:
+        check_batch(kinds, output_format, options)
+    except ValueError as error:
+        return json_response({'error': str(error)}, 400)
+
+    records = iter_batch(request_data['projects'], kinds, request_data.get('outputDir'), output_format, options)
+    return app.response_class(
+        response=(dumps(encode_value(record)) + '\n' for record in records),
+        status=200,
+        mimetype='application/x-ndjson'
+    )
+
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    # Queues a parse or interface analysis and returns its job id right away
+    from src.jobs import job_manager, QueueFull
+
+    request_data = request.get_json()
+    options = {key: value for key, value in request_data.items() if key not in ('kind', 'fileName')}
+    try:
+        job = job_manager.submit(request_data.get('kind', 'parse'), request_data['fileName'], options)
+    except ValueError as error:
+        return json_response({'error': str(error)}, 400)
+    except QueueFull:
+        return json_response({'error': 'Too many queued jobs'}, 503)
+    return json_response(job.to_dict(), 202)
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    from src.jobs import job_manager
+
+    job = job_manager.get(job_id)
+    if job is None:
+        return json_response({'error': 'Unknown job'}, 404)
+    return json_response(job.to_dict())
+
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    from src.jobs import job_manager
+
+    job = job_manager.get(job_id)
+    if job is None:
+        return json_response({'error': 'Unknown job'}, 404)
+    if job.status != 'done':
+        return json_response(job.to_dict(), 409)
+    return results_response(job.result, request.args)
+
+
+@app.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    from src.jobs import job_manager
+
+    job = job_manager.cancel(job_id)
+    if job is None:
+        return json_response({'error': 'Unknown job'}, 404)
+    return json_response(job.to_dict())
+
+
+def json_response(data, status=200):
+    from src.encoder import encode
+
+    return app.response_class(
+        response=encode(data),
+        status=status,
+        mimetype='application/json'
+    )
+
+
+def results_response(results, request_data):
+    # JSON by default, "format": "snapshot" returns the binary snapshot of src/snapshot.py
+    from src.encoder import encode
+    from src.snapshot import dumps_snapshot
+
+    if request_data.get('format') == 'snapshot':
+        with metrics.stage('encode'):
+            data = dumps_snapshot(results)
+        return app.response_class(
+            response=data,
+            status=200,
+            mimetype='application/octet-stream'
+        )
+
+    with metrics.stage('encode'):
+        data = encode(results)
     return app.response_class(
-        response=jsonpickle.encode(results, unpicklable=False),
+        response=data,
         status=200,
         mimetype='application/json'
     )
@@ -0,0 +1,117 @@
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from src.parser import parse_source_file, check_projection
+from src.interface import system_interfaces
+from src.encoder import encode
+from src.snapshot import dumps_snapshot
+from src.util import path_leaf, process_context
+from src.cache import get_cache, set_cache
+
+# Size of the process pool shared by every batch, which is also the number of projects analysed at once
+BATCH_WORKERS = int(os.environ.get('PYPARSER_BATCH_WORKERS', os.cpu_count() or 1))
+
+BATCH_KINDS = ('parse', 'interface')
+BATCH_FORMATS = {'json': '.json', 'snapshot': '.snapshot'}
+
+pool = None
+pool_lock = threading.Lock()
+
+
+def get_pool():
+    global pool
+    with pool_lock:
+        if pool is None:
+            pool = ProcessPoolExecutor(max_workers=BATCH_WORKERS, mp_context=process_context(),
+                                       initializer=set_cache, initargs=(get_cache(),))
+        return pool
+
+
+def reset_pool(broken):
+    # A worker died, the next batch gets a new pool
+    global pool
+    with pool_lock:
+        if pool is broken:
+            pool = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def output_name(project_path, kind, output_format):
+    # Projects with the same directory name get distinct files
+    digest = hashlib.sha1(os.path.abspath(project_path).encode()).hexdigest()[:8]
+    return '{}-{}.{}{}'.format(path_leaf(project_path), digest, kind, BATCH_FORMATS[output_format])
+
+
+def analyse_project(kind, project_path, options, output_dir=None, output_format='json'):
+    # Runs in a worker: analyses one project and writes its result to output_dir, or sends it back
+    record = {'project': project_path, 'kind': kind}
+    start = time.perf_counter()
+    try:
+        if not os.path.isdir(project_path):
+            raise NotADirectoryError('No such project directory: {}'.format(project_path))
+        if kind == 'parse':
+            result = parse_source_file(project_path, projection=options.get('projection', 'full'))
+        else:
+            result = system_interfaces(project_path)
+
+        if output_dir is None:
+            record['result'] = result
+        else:
+            data = dumps_snapshot(result) if output_format == 'snapshot' else encode(result).encode()
+            file_name = os.path.join(output_dir, output_name(project_path, kind, output_format))
+            with open(file_name + '.tmp', 'wb') as target:
+                target.write(data)
+            os.replace(file_name + '.tmp', file_name)
+            record['output'] = file_name
+        record['status'] = 'done'
+    except Exception as error:
+        record['status'] = 'error'
+        record['error'] = '{}: {}'.format(type(error).__name__, error)
+    record['seconds'] = round(time.perf_counter() - start, 3)
+    return record
+
+
+def check_batch(kinds, output_format, options):
+    for kind in kinds:
+        if kind not in BATCH_KINDS:
+            raise ValueError('Unknown kind: {}'.format(kind))
+    if output_format not in BATCH_FORMATS:
+        raise ValueError('Unknown format: {}'.format(output_format))
+    check_projection(options.get('projection', 'full'))
+
+
+def iter_batch(projects, kinds=('parse', 'interface'), output_dir=None, output_format='json', options=None):
+    # Analyses every project (for every kind) in the shared pool, yields a record per analysis as soon as it
+    # completes. Without output_dir the records carry the result itself
+    options = options or dict()
+    check_batch(kinds, output_format, options)
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+
+    executor = get_pool()
+    futures = dict()
+    try:
+        for project_path in projects:
+            for kind in kinds:
+                future = executor.submit(analyse_project, kind, project_path, options, output_dir, output_format)
+                futures[future] = (kind, project_path)
+
+        for future in as_completed(futures):
+            kind, project_path = futures.pop(future)
+            try:
+                yield future.result()
+            except BrokenProcessPool as error:
+                reset_pool(executor)
+                yield {'project': project_path, 'kind': kind, 'status': 'error',
+                       'error': '{}: {}'.format(type(error).__name__, error)}
+    finally:
+        # Analyses not started yet are dropped when the caller stops early
+        for future in futures:
+            future.cancel()
+
+
+def batch_analyse(projects, kinds=('parse', 'interface'), output_dir=None, output_format='json', options=None):
+    return list(iter_batch(projects, kinds, output_dir, output_format, options))
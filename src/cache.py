@@ -0,0 +1,133 @@
+import hashlib
+import os
+import pickle
+
+# Bump whenever the parser or the exit point analysis changes what they produce
+CACHE_VERSION = '4'
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'py-parser')
+DEFAULT_CACHE_SIZE = 512 * 1024 * 1024
+
+
+class ParseCache:
+    # On-disk cache of parse results keyed by file content hash and cache version
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_size=DEFAULT_CACHE_SIZE, enabled=True):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.enabled = enabled
+        self.size = None
+
+    def key(self, kind, source):
+        digest = hashlib.sha256(source).hexdigest()
+        return '{}-{}-{}'.format(kind, CACHE_VERSION, digest)
+
+    def entry_path(self, key):
+        return os.path.join(self.cache_dir, key[-2:], key + '.pickle')
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+
+        path = self.entry_path(key)
+        try:
+            with open(path, 'rb') as entry:
+                value = pickle.load(entry)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+        # Touch the entry so eviction drops the least recently used ones first
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return value
+
+    def put(self, key, value):
+        if not self.enabled:
+            return
+
+        path = self.entry_path(key)
+        try:
+            data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError, RecursionError):
+            return
+
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = '{}.{}.tmp'.format(path, os.getpid())
+            with open(temp_path, 'wb') as entry:
+                entry.write(data)
+            os.replace(temp_path, path)
+        except OSError:
+            return
+
+        if self.size is None:
+            self.size = self.disk_usage()
+        else:
+            self.size += len(data)
+
+        if self.size > self.max_size:
+            self.evict()
+
+    def entries(self):
+        if not os.path.isdir(self.cache_dir):
+            return
+        for bucket in os.scandir(self.cache_dir):
+            if bucket.is_dir():
+                for entry in os.scandir(bucket.path):
+                    if entry.name.endswith('.pickle'):
+                        yield entry
+
+    def disk_usage(self):
+        return sum(entry.stat().st_size for entry in self.entries())
+
+    def evict(self):
+        # Drop least recently used entries until the cache is back under 90% of its size
+        entries = [(entry.stat(), entry.path) for entry in self.entries()]
+        entries.sort(key=lambda item: item[0].st_mtime)
+        size = sum(stat.st_size for stat, _ in entries)
+        limit = self.max_size * 0.9
+
+        for stat, path in entries:
+            if size <= limit:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            size -= stat.st_size
+
+        self.size = size
+
+    def clear(self):
+        for entry in list(self.entries()):
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+        self.size = 0
+
+
+def cache_from_env():
+    # PYPARSER_CACHE=off disables the cache, the other variables override its defaults
+    enabled = os.environ.get('PYPARSER_CACHE', 'on').lower() not in ('0', 'off', 'false', 'no')
+    cache_dir = os.environ.get('PYPARSER_CACHE_DIR', DEFAULT_CACHE_DIR)
+    max_size = int(os.environ.get('PYPARSER_CACHE_SIZE', DEFAULT_CACHE_SIZE))
+    return ParseCache(cache_dir, max_size, enabled)
+
+
+parse_cache = cache_from_env()
+
+
+def get_cache():
+    return parse_cache
+
+
+def set_cache(cache):
+    global parse_cache
+    parse_cache = cache
+
+
+def configure_cache(cache_dir=None, max_size=None, enabled=True):
+    set_cache(ParseCache(cache_dir or DEFAULT_CACHE_DIR, max_size or DEFAULT_CACHE_SIZE, enabled))
+    return parse_cache
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+
+"""
+Command line interface, runs the analyses of the Flask app directly and writes their results to a file
+or standard output.
+
+Usage: python -m src parse PATH [--workers N] [--projection P] [--format json|ndjson|snapshot] [--output FILE]
+       python -m src interface PATH [--workers N] [--format json|ndjson|snapshot] [--output FILE]
+       python -m src language PATH
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from src.parser import PROJECTIONS
+
+# The analysis modules (astroid in particular) are only imported by the subcommand that needs them
+
+FORMATS = ('json', 'ndjson', 'snapshot')
+
+
+class Progress:
+    # Reports the number of files processed on stderr, at most every interval seconds
+    def __init__(self, label, stream=sys.stderr, interval=0.5):
+        self.label = label
+        self.stream = stream
+        self.interval = interval
+        self.files = 0
+        self.start = time.perf_counter()
+        self.last = 0
+        self.live = stream.isatty()
+
+    def __call__(self, file_name):
+        self.files += 1
+        now = time.perf_counter()
+        # The running count is only drawn on terminals, logs just get the summary line
+        if self.live and now - self.last >= self.interval:
+            self.last = now
+            self.stream.write('\r\033[K{}: {} files, {:.1f}s'.format(self.label, self.files, now - self.start))
+            self.stream.flush()
+
+    def finish(self):
+        files = '{} files '.format(self.files) if self.files else ''
+        self.stream.write('{}{}: {}in {:.2f}s\n'.format('\r\033[K' if self.live else '', self.label, files,
+                                                        time.perf_counter() - self.start))
+        self.stream.flush()
+
+
+class NullProgress:
+    def __call__(self, file_name):
+        pass
+
+    def finish(self):
+        pass
+
+
+def open_output(args, binary=False):
+    if args.output is None or args.output == '-':
+        return sys.stdout.buffer if binary else sys.stdout
+    return open(args.output, 'wb' if binary else 'w')
+
+
+def write_results(results, args, ndjson_records):
+    target = open_output(args, binary=args.format == 'snapshot')
+    try:
+        if args.format == 'snapshot':
+            from src.snapshot import dumps_snapshot
+            target.write(dumps_snapshot(results))
+        elif args.format == 'ndjson':
+            # Each record is encoded and written on its own, the document is never built as a whole
+            from src.encoder import encode_value, dumps
+            for record in ndjson_records(results):
+                target.write(dumps(encode_value(record)) + '\n')
+        else:
+            from src.encoder import encode
+            target.write(encode(results) + '\n')
+    finally:
+        if target not in (sys.stdout, sys.stdout.buffer):
+            target.close()
+        else:
+            target.flush()
+
+
+def parse_records(system):
+    # Same lines as the streamed /parse: system, apps, packages and modules, each with its app.
+    # A file parses to a single module
+    from src.encoder import encode_record
+    from src.nodes import PyModule
+
+    if system is None:
+        return
+    if isinstance(system, PyModule):
+        yield encode_record(None, system)
+        return
+
+    def walk(app, container):
+        for module in container.modules:
+            yield encode_record(app, module)
+        for package in container.packages:
+            yield encode_record(app, package)
+            yield from walk(app, package)
+
+    yield encode_record(None, system)
+    for app in system.apps:
+        yield encode_record(app, app)
+        yield from walk(app, app)
+
+
+def interface_records(system):
+    # A line per service interface, each with the name of its system
+    for interface in system.interfaces:
+        yield {'system': system.name, 'interface': interface}
+
+
+def configure(args):
+    if args.no_cache or args.cache_dir:
+        from src.cache import configure_cache
+        configure_cache(cache_dir=args.cache_dir, enabled=not args.no_cache)
+
+
+def run_parse(args, progress):
+    from src.parser import parse_source_file
+    system = parse_source_file(args.path, workers=args.workers, progress=progress, projection=args.projection)
+    return system, parse_records
+
+
+def run_interface(args, progress):
+    from src.interface import system_interfaces
+    system = system_interfaces(args.path, args.project_name, progress=progress, workers=args.workers)
+    return system, interface_records
+
+
+def run_language(args, progress):
+    from src.languageDiscovery import getLanguage
+    return getLanguage(args.path), lambda language: [language]
+
+
+commands = {
+    'parse': run_parse,
+    'interface': run_interface,
+    'language': run_language,
+}
+
+
+def build_parser():
+    arg_parser = argparse.ArgumentParser(prog='python -m src', description=__doc__,
+                                         formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = arg_parser.add_subparsers(dest='command', required=True)
+
+    options = argparse.ArgumentParser(add_help=False)
+    options.add_argument('path', help='project directory (or file)')
+    options.add_argument('--format', default='json', choices=FORMATS, help='output format (default: json)')
+    options.add_argument('-o', '--output', help='output file, standard output by default')
+    options.add_argument('-q', '--quiet', action='store_true', help='do not report progress and timing')
+    options.add_argument('--cache-dir', help='parse cache directory (default: PYPARSER_CACHE_DIR)')
+    options.add_argument('--no-cache', action='store_true', help='do not read or write the parse cache')
+
+    analysis = argparse.ArgumentParser(add_help=False)
+    analysis.add_argument('-w', '--workers', type=int, default=None, help='worker processes (default: serial)')
+
+    parse_parser = subparsers.add_parser('parse', parents=[options, analysis],
+                                         help='parse a project into its system, apps, packages and modules')
+    parse_parser.add_argument('--projection', default='full', choices=PROJECTIONS,
+                              help='how much of each module is extracted (default: full)')
+    interface_parser = subparsers.add_parser('interface', parents=[options, analysis],
+                                             help='end points and exit points of every service')
+    interface_parser.add_argument('--project-name', help='name of the system, the directory name by default')
+    subparsers.add_parser('language', parents=[options], help='main language of a project')
+    return arg_parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if not os.path.exists(args.path):
+        print('{}: no such file or directory'.format(args.path), file=sys.stderr)
+        return 2
+    configure(args)
+
+    progress = NullProgress() if args.quiet else Progress(args.command)
+    results, ndjson_records = commands[args.command](args, progress)
+    progress.finish()
+
+    start = time.perf_counter()
+    write_results(results, args, ndjson_records)
+    if not args.quiet:
+        print('{}: written{} in {:.2f}s'.format(
+            args.format, ' to ' + args.output if args.output and args.output != '-' else '',
+            time.perf_counter() - start), file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,238 @@
+import os
+import os.path
+import re
+from src.ignore import files_to_ignore
+from src import metrics
+
+
+class FileEntry:
+    def __init__(self, path, name, kind, size, mtime, service):
+        self.path = path
+        self.name = name
+        self.kind = kind
+        self.size = size
+        self.mtime = mtime
+        self.service = service
+
+
+class FileIndex:
+    # Result of a single walk over a project, shared by every analysis of a request
+    def __init__(self, root):
+        self.root = root
+        self.entries = list()
+        self.services = list()
+        self.children = dict()
+
+    def subtree(self, dir_path):
+        # Index limited to one directory, small enough to hand to another process
+        index = FileIndex(dir_path)
+        prefix = dir_path + os.sep
+        index.entries = [entry for entry in self.entries if entry.path.startswith(prefix)]
+        index.children = {path: entries for path, entries in self.children.items()
+                          if path == dir_path or path.startswith(prefix)}
+        return index
+
+    def list_dir(self, dir_path):
+        return self.children.get(dir_path, list())
+
+    def files(self, suffix=None):
+        # Every file of the project in depth-first order
+        for entry in self.entries:
+            if entry.kind == 'file' and (suffix is None or entry.name.endswith(suffix)):
+                yield entry
+
+    def walk_files(self, dir_path, suffix=None):
+        # Files below a directory in the order os.walk visits them
+        dirs = list()
+        for entry in self.list_dir(dir_path):
+            if entry.kind == 'dir':
+                dirs.append(entry)
+            elif suffix is None or entry.name.endswith(suffix):
+                yield entry
+        for entry in dirs:
+            yield from self.walk_files(entry.path, suffix)
+
+
+class IgnoreRules:
+    # Subset of the .gitignore syntax: negation, directory-only, anchored and ** patterns
+    def __init__(self, base, patterns):
+        self.base = base
+        self.rules = list()
+        for pattern in patterns:
+            pattern = pattern.rstrip()
+            if not pattern or pattern.startswith('#'):
+                continue
+
+            negate = pattern.startswith('!')
+            if negate:
+                pattern = pattern[1:]
+            dir_only = pattern.endswith('/')
+            pattern = pattern.rstrip('/')
+            anchored = '/' in pattern
+            pattern = pattern.lstrip('/')
+            if pattern:
+                self.rules.append((re.compile(translate_pattern(pattern)), negate, dir_only, anchored))
+
+    def match(self, path, name, is_dir):
+        # Returns True when ignored, False when explicitly included and None when no rule applies
+        result = None
+        relative = os.path.relpath(path, self.base).replace(os.sep, '/')
+        for regex, negate, dir_only, anchored in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if regex.match(relative if anchored else name):
+                result = not negate
+        return result
+
+
+def translate_pattern(pattern):
+    regex = ''
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith('**/', i):
+            regex += '(?:.*/)?'
+            i += 3
+        elif pattern.startswith('**', i):
+            regex += '.*'
+            i += 2
+        elif pattern[i] == '*':
+            regex += '[^/]*'
+            i += 1
+        elif pattern[i] == '?':
+            regex += '[^/]'
+            i += 1
+        elif pattern[i] == '[' and ']' in pattern[i + 1:]:
+            end = pattern.index(']', i + 1)
+            regex += '[' + pattern[i + 1:end].replace('!', '^', 1) + ']'
+            i = end + 1
+        else:
+            regex += re.escape(pattern[i])
+            i += 1
+    return regex + '$'
+
+
+def read_gitignore(dir_path):
+    try:
+        with open(os.path.join(dir_path, '.gitignore'), 'r') as source:
+            return IgnoreRules(dir_path, source.read().splitlines())
+    except (OSError, UnicodeDecodeError):
+        return None
+
+
+def is_ignored(rules, path, name, is_dir):
+    ignored = False
+    for rule in rules:
+        result = rule.match(path, name, is_dir)
+        if result is not None:
+            ignored = result
+    return ignored
+
+
+def discover(project_path, use_gitignore=True):
+    # Walks the project once with os.scandir, skipping files_to_ignore and .gitignore'd paths
+    index = FileIndex(project_path)
+    rules = [IgnoreRules(project_path, files_to_ignore)]
+    with metrics.stage('discover'):
+        try:
+            stat = os.stat(project_path)
+            ancestors = {(stat.st_dev, stat.st_ino)}
+        except OSError:
+            ancestors = set()
+        scan_dir(index, project_path, None, rules, use_gitignore, ancestors)
+    return index
+
+
+def scan_dir(index, dir_path, service, rules, use_gitignore, ancestors=frozenset()):
+    # Symlinked directories are followed, ancestors holds the (device, inode) of the directories being
+    # scanned so that a link back to one of them is not followed in a loop
+    try:
+        with os.scandir(dir_path) as it:
+            dir_entries = list(it)
+    except OSError:
+        return
+
+    if use_gitignore and any(entry.name == '.gitignore' for entry in dir_entries):
+        gitignore = read_gitignore(dir_path)
+        if gitignore:
+            rules = rules + [gitignore]
+
+    children = list()
+    index.children[dir_path] = children
+    for dir_entry in dir_entries:
+        try:
+            is_dir = dir_entry.is_dir()
+            if is_ignored(rules, dir_entry.path, dir_entry.name, is_dir):
+                continue
+
+            if is_dir:
+                stat = dir_entry.stat()
+                dir_key = (stat.st_dev, stat.st_ino)
+                if dir_key in ancestors:
+                    continue
+                entry = FileEntry(dir_entry.path, dir_entry.name, 'dir', 0, None, service)
+            elif dir_entry.is_file():
+                stat = dir_entry.stat()
+                entry = FileEntry(dir_entry.path, dir_entry.name, 'file', stat.st_size, stat.st_mtime_ns, service)
+            else:
+                continue
+        except OSError:
+            continue
+
+        children.append(entry)
+        index.entries.append(entry)
+
+        if is_dir:
+            # Top level, non hidden directories are the services of a project
+            entry_service = service
+            if service is None and not dir_entry.name.startswith('.'):
+                entry_service = dir_entry.path
+                entry.service = entry_service
+                index.services.append(entry_service)
+            scan_dir(index, dir_entry.path, entry_service, rules, use_gitignore, ancestors | {dir_key})
+
+
+def iter_files(project_path, use_gitignore=True, hidden=True):
+    # Lazy version of discover for callers that stop at the first file they need: yields file paths in
+    # the order of FileIndex.files, with the same ignore rules, and stats nothing but directories
+    rules = [IgnoreRules(project_path, files_to_ignore)]
+    try:
+        stat = os.stat(project_path)
+        ancestors = {(stat.st_dev, stat.st_ino)}
+    except OSError:
+        ancestors = set()
+    yield from iter_dir(project_path, rules, use_gitignore, hidden, ancestors)
+
+
+def iter_dir(dir_path, rules, use_gitignore, hidden, ancestors):
+    try:
+        with os.scandir(dir_path) as it:
+            dir_entries = list(it)
+    except OSError:
+        return
+
+    if use_gitignore and any(entry.name == '.gitignore' for entry in dir_entries):
+        gitignore = read_gitignore(dir_path)
+        if gitignore:
+            rules = rules + [gitignore]
+
+    for dir_entry in dir_entries:
+        if not hidden and dir_entry.name.startswith('.'):
+            continue
+        try:
+            is_dir = dir_entry.is_dir()
+            if is_ignored(rules, dir_entry.path, dir_entry.name, is_dir):
+                continue
+            if is_dir:
+                stat = dir_entry.stat()
+                dir_key = (stat.st_dev, stat.st_ino)
+                if dir_key in ancestors:
+                    continue
+            elif not dir_entry.is_file():
+                continue
+        except OSError:
+            continue
+
+        if is_dir:
+            yield from iter_dir(dir_entry.path, rules, use_gitignore, hidden, ancestors | {dir_key})
+        else:
+            yield dir_entry.path
@@ -0,0 +1,258 @@
+import json
+import os
+from src.nodes import *
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# The json backend reproduces jsonpickle's output byte for byte, PYPARSER_JSON_BACKEND=orjson
+# uses orjson when it is installed and emits the same document in compact form
+JSON_BACKEND = os.environ.get('PYPARSER_JSON_BACKEND', 'json')
+
+
+def encode_system(node):
+    return {
+        'apps': [encode_app(app) for app in node.apps],
+        'name': node.name,
+        'type': node.type,
+    }
+
+
+def encode_app(node):
+    return {
+        'modules': [encode_module(module) for module in node.modules],
+        'name': node.name,
+        'packages': [encode_package(package) for package in node.packages],
+        'type': node.type,
+    }
+
+
+def encode_package(node):
+    return {
+        'full_name': node.full_name,
+        'modules': [encode_module(module) for module in node.modules],
+        'name': node.name,
+        'packages': [encode_package(package) for package in node.packages],
+        'relative_name': node.relative_name,
+        'type': node.type,
+    }
+
+
+def encode_module(node):
+    return {
+        'classes': [encode_class(cls) for cls in node.classes],
+        'full_name': node.full_name,
+        'functions': [encode_function(func) for func in node.functions],
+        'imports': [encode_import(imp) for imp in node.imports],
+        'name': node.name,
+        'relative_name': node.relative_name,
+        'statements': [encode_value(statement) for statement in node.statements],
+        'type': node.type,
+    }
+
+
+def encode_import(node):
+    return {'name': node.name, 'type': node.type}
+
+
+def encode_class(node):
+    return {
+        'bases': [encode_base(base) for base in node.bases],
+        'classes': [encode_class(cls) for cls in node.classes],
+        'component_type': node.component_type,
+        'functions': [encode_function(func) for func in node.functions],
+        'imports': [encode_import(imp) for imp in node.imports],
+        'name': node.name,
+        'statements': [encode_value(statement) for statement in node.statements],
+        'type': node.type,
+    }
+
+
+def encode_base(node):
+    return {'name': node.name, 'type': node.type, 'value': node.value}
+
+
+def encode_function(node):
+    return {
+        'args': list(node.args),
+        'classes': [encode_class(cls) for cls in node.classes],
+        'component_type': node.component_type,
+        'functions': [encode_function(func) for func in node.functions],
+        'imports': [encode_import(imp) for imp in node.imports],
+        'name': node.name,
+        'statements': [encode_value(statement) for statement in node.statements],
+        'type': node.type,
+    }
+
+
+def encode_call(node):
+    return {
+        'args': [encode_value(arg) for arg in node.args],
+        'func': node.func,
+        'keywords': list(node.keywords),
+        'statement_type': node.statement_type,
+        'type': node.type,
+    }
+
+
+def encode_name(node):
+    return {'name': node.name, 'statement_type': node.statement_type, 'type': node.type}
+
+
+def encode_arg_call(node):
+    return {
+        'statements': [encode_value(statement) for statement in node.statements],
+        'type': node.type,
+    }
+
+
+def encode_point(node):
+    result = {
+        'decorators': [encode_value(decorator) for decorator in node.decorators],
+        'file_name': node.file_name,
+        'func_name': node.func_name,
+    }
+    # Only present when the view of an end point restricts its HTTP methods
+    if node.http_methods is not None:
+        result['http_methods'] = list(node.http_methods)
+    result.update({
+        'line_no': node.line_no,
+        'name': encode_value(node.name),
+        'path': encode_value(node.path),
+        'payload': [encode_value(payload) for payload in node.payload],
+        'response': encode_value(node.response),
+    })
+    return result
+
+
+def encode_payload(node):
+    return {
+        'name': node.name,
+        'props': [encode_value(prop) for prop in node.props],
+        'type': node.type,
+    }
+
+
+def encode_interface_system(node):
+    return {
+        'interfaces': [encode_interface(interface) for interface in node.interfaces],
+        'name': node.name,
+    }
+
+
+def encode_interface(node):
+    result = {
+        'end_points': [encode_point(point) for point in node.end_points],
+        'exit_points': [encode_point(point) for point in node.exit_points],
+        'name': node.name,
+    }
+    # Only present when a scan of the service failed
+    if node.errors:
+        result['errors'] = list(node.errors)
+    return result
+
+
+def encode_graph(node):
+    return {
+        'adjacency': {service: list(targets) for service, targets in node.adjacency.items()},
+        'edges': [encode_edge(edge) for edge in node.edges],
+        'name': node.name,
+        'services': list(node.services),
+        'unmatched': [encode_edge(edge) for edge in node.unmatched],
+    }
+
+
+def encode_edge(node):
+    return {
+        'file_name': node.file_name,
+        'func_name': node.func_name,
+        'line_no': node.line_no,
+        'method': node.method,
+        'path': encode_value(node.path),
+        'route': encode_value(node.route),
+        'source': node.source,
+        'target': node.target,
+        'target_file_name': node.target_file_name,
+        'target_func_name': node.target_func_name,
+    }
+
+
+encoders = {
+    PySystem: encode_system,
+    PyApp: encode_app,
+    PyPackage: encode_package,
+    PyModule: encode_module,
+    PyImport: encode_import,
+    PyClass: encode_class,
+    PyBase: encode_base,
+    PyFunction: encode_function,
+    PyCall: encode_call,
+    PyName: encode_name,
+    PyArgCall: encode_arg_call,
+    Point: encode_point,
+    Payload: encode_payload,
+    System: encode_interface_system,
+    Interface: encode_interface,
+    Graph: encode_graph,
+    Edge: encode_edge,
+}
+
+primitives = (str, int, float, bool, type(None))
+
+
+def encode_value(value):
+    # Turns nodes into plain dicts and lists with the same content jsonpickle produces for them
+    value_type = type(value)
+    if value_type in primitives:
+        return value
+
+    encoder = encoders.get(value_type)
+    if encoder is not None:
+        return encoder(value)
+    if value_type is list or value_type is tuple:
+        return [encode_value(item) for item in value]
+    if value_type is dict:
+        return {str(key): encode_value(item) for key, item in value.items()}
+
+    # Anything else (astroid leftovers, bytes, complex numbers) is rare, let jsonpickle decide
+    import jsonpickle.pickler
+    return jsonpickle.pickler.Pickler(unpicklable=False).flatten(value)
+
+
+def dumps(value, backend=None):
+    if (backend or JSON_BACKEND) == 'orjson' and orjson is not None:
+        try:
+            return orjson.dumps(value, option=orjson.OPT_SORT_KEYS).decode()
+        except TypeError:
+            # Integers beyond 64 bits and other values orjson refuses
+            pass
+    return json.dumps(value, sort_keys=True)
+
+
+def encode(node, backend=None):
+    # Drop-in replacement for jsonpickle.encode(node, unpicklable=False)
+    return dumps(encode_value(node), backend)
+
+
+def encode_record(app, node):
+    # Flat record for one streamed node, containers are sent without their children
+    if isinstance(node, PySystem):
+        record = {'name': node.name, 'type': node.type}
+    elif isinstance(node, PyApp):
+        record = {'name': node.name, 'type': node.type}
+    elif isinstance(node, PyPackage):
+        record = {'full_name': node.full_name, 'name': node.name, 'relative_name': node.relative_name, 'type': node.type}
+    else:
+        record = encode_value(node)
+
+    if app is not None:
+        record['app'] = app.name
+    return record
+
+
+def stream_ndjson(nodes):
+    # Newline delimited JSON, one line per (app, node) pair from iter_source_file
+    for app, node in nodes:
+        yield dumps(encode_record(app, node)) + '\n'
@@ -1,53 +1,60 @@
 import astroid
 import os
-from src.util import ast_walk, path_base
+from src.util import ast_walk_types
 from src.nodes import Point, Payload
+from src.registry import ModuleRegistry
+from src.urlconf import SymbolIndex, resolve_urlpatterns, call_name
+from src import metrics
+from src.inference import infer_value
+
+class_view_methods = ('get', 'post', 'put', 'patch', 'delete', 'head', 'options')
+
+# Decorators whose list argument, positional or http_method_names=, restricts the methods of a view
+method_decorators = ('api_view', 'require_http_methods')
 
 
 def get_project_settings(tree):
     # Retrieves the settings config for a Django Project
-    for node in ast_walk(tree):
-        if isinstance(node, astroid.Name) and node.name == 'os':
+    for node in ast_walk_types(tree, astroid.Name):
+        if node.name == 'os':
             env_node = node.parent
             if env_node and isinstance(env_node, astroid.Attribute) and env_node.attrname == 'environ':
                 set_default = env_node.parent
                 if set_default and isinstance(set_default, astroid.Attribute) and set_default.attrname == 'setdefault':
                     setting = node.statement()
-                    return next(setting.value.args[1].infer()).value
+                    return infer_value(setting.value.args[1])
     return None
 
 
 def get_root_conf(tree):
     # Retrieves the root config for a Django Project
-    for node in ast_walk(tree):
-        if isinstance(node, astroid.Assign):
-            target = node.targets[0]
-            if target.name == 'ROOT_URLCONF':
-                return node.value.value
+    for node in ast_walk_types(tree, astroid.Assign):
+        target = node.targets[0]
+        if target.name == 'ROOT_URLCONF':
+            return node.value.value
     return None
 
 
-def get_end_points(file_path):
+def get_end_points(file_path, registry=None, index=None):
     # Process various endpoints of a Django Project
+    if registry is None:
+        registry = ModuleRegistry()
+    symbols = SymbolIndex(file_path, registry, index)
 
     # Retrieve manage.py config file
     manage = 'manage.py'
     manage = os.path.join(file_path, manage)
-    with open(manage, "r") as source:
-        tree = astroid.parse(source.read())
+    tree = registry.astroid_tree(manage)
     setting_path = get_project_settings(tree)
 
-    setting_path = format_path(file_path, setting_path)
-    with open(setting_path, "r") as source:
-        tree = astroid.parse(source.read())
+    tree = symbols.module_tree(setting_path) or registry.astroid_tree(format_path(file_path, setting_path))
     root_conf = get_root_conf(tree)
 
-    root_conf = format_path(file_path, root_conf)
-    with open(root_conf, "r") as source:
-        tree = astroid.parse(source.read())
-    url_patterns = tree.lookup('urlpatterns')
-    url_patterns = url_patterns[1][0].statement()
-    return process_file_for_url_patterns(tree, path_base(root_conf), url_patterns.value)
+    end_points = list()
+    with metrics.stage('end_points'):
+        for pattern in resolve_urlpatterns(symbols, root_conf):
+            end_points.append(process_url_pattern(pattern, symbols.module_path(pattern.module_name)))
+    return end_points
 
 
 def format_path(root_path, curr_file):
@@ -56,84 +63,52 @@ def format_path(root_path, curr_file):
     return os.path.join(root_path, curr_file)
 
 
-def process_file_for_url_patterns(ast_node, root_file, patterns):
-    end_points = list()
-
-    for pattern in patterns.elts:
-        end_point = Point()
-        path = next(pattern.args[0].infer()).value
-        end_point.path = path
-        # end_point.func_name = pattern
-
-        name = None
-        if pattern.keywords:
-            name = next(pattern.keywords[0].value.infer()).value
-
-        view = pattern.args[1]
-        add_node = False
-        if isinstance(view, astroid.Attribute):
-            add_node = True
-            if not name:
-                name = view.attrname
-            end_point.name = name
-
-            view_el = view.expr.name
-            imp = ast_node.lookup(view_el)[1][0]
-
-            view_func, file_ = get_view_at_import(root_file, imp.names[0][0], imp.level, view.attrname)
-            end_point.line_no = view_func.lineno
-            end_point.name = view_func.name
-            end_point.func_name = view_func.name
-            end_point.file_name = file_
-
-            for arg in view_func.args.args:
-                arg_name = arg.name
-                end_point.payload.append(arg_name)
-
-            response = Payload()
-            end_point.response = response
-
-            # Decorators
-            if view_func.decorators:
-                decs = view_func.decorators.nodes
-                for n in decs:
-                    if isinstance(n, astroid.Name):
-                        end_point.decorators.append(n.name)
-                    elif isinstance(n, astroid.Call):
-                        d = dict()
-                        d['name'] = n.func.name
-                        for key in n.keywords:
-                            d[key.arg] = list()
-                            for v in key.value.elts:
-                                d[key.arg].append(v.value)
-                        end_point.decorators.append(d)
-
-        if add_node:
-            end_points.append(end_point)
-
-    return end_points
-
-
-def get_url_statements(root):
-    for n in root.get_children():
-        if isinstance(n, astroid.nodes.Assign):
-            if check_if_urlpatterns(n):
-                yield n
-
-
-def check_if_urlpatterns(node):
-    if node.is_statement:
-        targets = node.targets
-        if targets:
-            target = targets[0]
-            if hasattr(target, 'name') and target.name == 'urlpatterns':
-                return True
-    return False
-
-
-def get_view_at_import(root_package, module_name, level, func_name):
-    view_path = os.path.join(root_package, '.' * level + '/' + module_name + '.py')
-    view_path = os.path.normpath(view_path)
-    with open(view_path, "r") as source:
-        ast_node = astroid.parse(source.read())
-    return ast_node.lookup(func_name)[1][0], view_path
+def process_url_pattern(pattern, file_name):
+    end_point = Point()
+    view = pattern.view
+    end_point.path = pattern.route
+    end_point.line_no = view.lineno
+    end_point.name = view.name
+    end_point.func_name = view.name
+    end_point.file_name = file_name
+
+    if isinstance(view, astroid.ClassDef):
+        # Class based views answer the HTTP methods they define a handler for
+        handlers = [method for method in class_view_methods if method in view.locals]
+        if handlers:
+            for arg in view.locals[handlers[0]][0].args.args:
+                if arg.name != 'self':
+                    end_point.payload.append(arg.name)
+            end_point.http_methods = [method.upper() for method in handlers]
+    else:
+        for arg in view.args.args:
+            end_point.payload.append(arg.name)
+
+    response = Payload()
+    end_point.response = response
+
+    # Decorators
+    if view.decorators:
+        for n in view.decorators.nodes:
+            if isinstance(n, astroid.Name):
+                end_point.decorators.append(n.name)
+            elif isinstance(n, astroid.Call):
+                d = dict()
+                d['name'] = call_name(n)
+                for key in n.keywords or ():
+                    if isinstance(key.value, (astroid.List, astroid.Tuple)):
+                        d[key.arg] = const_list(key.value)
+                end_point.decorators.append(d)
+
+                if d['name'] in method_decorators:
+                    # @api_view(['GET', 'POST']) or @api_view(http_method_names=['GET', 'POST'])
+                    if n.args and isinstance(n.args[0], (astroid.List, astroid.Tuple)):
+                        end_point.http_methods = const_list(n.args[0])
+                    elif 'http_method_names' in d:
+                        end_point.http_methods = d['http_method_names']
+
+    return end_point
+
+
+def const_list(node):
+    return [v.value for v in node.elts if isinstance(v, astroid.Const)]
@@ -1,96 +1,106 @@
 import astroid
-import astor
-import os
-from src.util import ast_walk
+import mmap
+from src.discovery import discover
 from src.nodes import Point, Payload
+from src.cache import get_cache
+from src.registry import ModuleRegistry
+from src.http_clients import default_matcher
+from src import metrics
+from src.inference import inferrer, infer_value, UNKNOWN
 
 
-def process_exit_points(project_path):
+def process_exit_points(project_path, file_points=None, index=None, registry=None, progress=None,
+                        matcher=None):
+    # file_points optionally maps file paths to exit points that are still valid, it is filled as files are processed
+    if index is None:
+        index = discover(project_path)
+    if registry is None:
+        registry = ModuleRegistry()
+
     exit_points = list()
-    for path, file_name in astor.code_to_ast.find_py_files(project_path):
-        file_path = os.path.join(path, file_name)
-        exit_points.extend(get_exit_points(file_path))
+    for entry in index.walk_files(project_path, '.py'):
+        file_path = entry.path
+        if file_points is None:
+            points = get_exit_points(file_path, registry, matcher)
+        else:
+            if file_path not in file_points:
+                file_points[file_path] = get_exit_points(file_path, registry, matcher)
+            points = file_points[file_path]
+
+        exit_points.extend(points)
+        if progress:
+            progress(file_path)
     return exit_points
 
 
-def get_exit_points(file_name):
-    with open(file_name, "r") as source:
-        ast_node = astroid.parse(source.read())
+def mentions_any(file_name, names):
+    # Searches the raw bytes of a file through a memory map, without reading it in
+    needles = [name.encode() for name in names]
+    with open(file_name, 'rb') as source:
+        try:
+            data = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped
+            return False
+        with data:
+            return any(data.find(needle) != -1 for needle in needles)
+
+
+def get_exit_points(file_name, registry=None, matcher=None):
+    if matcher is None:
+        matcher = default_matcher
+    if not mentions_any(file_name, matcher.trigger_names):
+        return list()
+
+    if registry is None:
+        registry = ModuleRegistry()
+    data = registry.source(file_name)
+
+    cache = get_cache()
+    key = cache.key('exit_points-' + matcher.fingerprint, data)
+    exit_points = cache.get(key)
+    if exit_points is not None:
+        # Identical sources may live at several paths
+        for point in exit_points:
+            point.file_name = file_name
+        return exit_points
+
+    ast_node = registry.astroid_tree(file_name)
+    inferred = inferred_count()
+    with metrics.stage('exit_points', file_name):
+        exit_points = find_exit_points(ast_node, file_name, matcher)
+
+    # The cache key only covers this file. Values that needed astroid inference may come from other
+    # modules (or be lost to the inference budget), so those exit points are not stored
+    if inferred_count() == inferred:
+        cache.put(key, exit_points)
+    return exit_points
+
 
+def find_exit_points(ast_node, file_name, matcher):
     exit_points = list()
-
-    for node in find_request_from_walk(ast_node):
+    for call_node, call_rule in matcher.find_calls(ast_node):
         point = Point()
-        scope_func = node.scope()
-        statement = find_statement_node(node)
+        # The enclosing function (or class, lambda, module); comprehensions have a scope but no name
+        scope_func = call_node.frame()
+        statement = find_statement_node(call_node)
 
+        process_request(call_node, call_rule, point)
         if isinstance(statement, astroid.Assign):
             response = statement.targets[0]
-            request = statement.value
-            process_request(request, point)
             process_response(response, point)
-        elif isinstance(statement, astroid.Expr):
-            request = statement.value
-            process_request(request, point)
 
         point.file_name = file_name
         point.func_name = scope_func.name
-        point.line_no = node.lineno
+        point.line_no = call_node.lineno
 
         exit_points.append(point)
-
     return exit_points
 
 
-def get_request_statements(root):
-    if isinstance(root, astroid.nodes.Assign):
-        if check_if_request(root):
-            yield root
-
-    if hasattr(root, 'body'):
-        for n in root.body:
-            yield from get_request_statements(n)
-
-
-def check_if_request(node):
-    if node.is_statement:
-        value = node.value
-        if hasattr(value, 'func'):
-            func = value.func
-            return find_request_from_func(func)
-
-    return False
-
-
-def find_request_from_func(func):
-    if hasattr(func, 'expr'):
-        return find_request_from_expr(func.expr)
-
-
-def find_request_from_expr(expr):
-    if hasattr(expr, 'name'):
-        name = expr.name
-        if name == 'requests':
-            return True
-    if hasattr(expr, 'func'):
-        return find_request_from_func(expr.func)
-
-    return False
-
-
-def find_request_from_walk(root):
-    for node in ast_walk(root):
-        if hasattr(node, 'name'):
-            name = node.name
-            if name == 'requests':
-                yield node
-
-
-def find_parent_function(root):
-    if isinstance(root.parent, astroid.FunctionDef):
-        return root.parent
-    else:
-        return find_parent_function(root.parent)
+def inferred_count():
+    # Values looked up through astroid so far, rather than folded from literals
+    return inferrer.stats['hits'] + inferrer.stats['misses']
 
 
 def find_statement_node(expr):
@@ -100,42 +110,47 @@ def find_statement_node(expr):
     return state
 
 
-request_types = ['get', 'post', 'delete', 'put']
+def find_keyword(call_node, names):
+    for keyword in call_node.keywords or ():
+        if keyword.arg in names:
+            return keyword.value
+    return None
 
 
-def find_rest_call_node(node):
-    res = node
-    if res.func.attrname in request_types:
-        return res, res.func.attrname
-    else:
-        return find_rest_call_node(res.func.expr)
-
-
-def process_request(expr_node, result):
+def process_request(call_node, call_rule, result):
     payload_meta = Payload()
     url = ''
 
-    call_node, request_type = find_rest_call_node(expr_node)
     request_args = call_node.args
-    url_node = request_args[0]
+    request_type = call_rule.verb
+    url_index = 0
+    if request_type is None:
+        # request(method, url, ...)
+        method = get_node_value(request_args[0]) if request_args else ''
+        request_type = method.lower() if isinstance(method, str) else ''
+        url_index = 1
+
+    if len(request_args) > url_index:
+        url_node = request_args[url_index]
+    else:
+        url_node = find_keyword(call_node, (call_rule.url_keyword,))
 
-    if hasattr(url_node, 'value'):
-        url = url_node.value
+    url_value = infer_value(url_node, UNKNOWN) if url_node is not None else UNKNOWN
+    if isinstance(url_value, str):
+        url = url_value
     elif isinstance(url_node, astroid.BinOp):
+        # Partly known concatenation or formatting, keeps the known sides
         url = ''
         url += get_node_value(url_node.left)
         url += get_node_value(url_node.right)
 
-    has_payload = len(request_args) > 1
+    has_payload = len(request_args) > url_index + 1
 
     payload_node = None
     if has_payload:
-        payload_node = request_args[1]
-
-    if not has_payload and call_node.keywords:
-        for keyword in call_node.keywords:
-            if keyword.arg == 'data':
-                payload_node = keyword.value
+        payload_node = request_args[url_index + 1]
+    else:
+        payload_node = find_keyword(call_node, call_rule.payload_keywords)
 
     if payload_node:
         if isinstance(payload_node, astroid.Dict):
@@ -143,8 +158,9 @@ def process_request(expr_node, result):
             payload_meta.name = '_dict'
 
             for key, value in payload_node.items:
-                key = next(key.infer()).value
-                payload_meta.props.append(key)
+                key = infer_value(key)
+                if key is not None:
+                    payload_meta.props.append(key)
 
     result.name = request_type
     result.payload.append(payload_meta)
@@ -152,8 +168,9 @@ def process_request(expr_node, result):
 
 
 def get_node_value(node):
-    if hasattr(node, 'value'):
-        return node.value
+    value = infer_value(node)
+    if isinstance(value, str):
+        return value
     return ''
 
 
@@ -0,0 +1,168 @@
+import re
+from urllib.parse import urlsplit
+from src.nodes import Graph, Edge
+
+WILDCARD = '*'
+
+# Placeholders left in exit point urls by string formatting: %s, %(name)s, {} and {name}
+format_field = re.compile(r'%(\([^)]*\))?[-#0 +]*\d*(\.\d+)?[sdifr]|\{[^}]*\}')
+# Django path converters, <int:pk> or <slug>
+path_converter = re.compile(r'<[^>]*>')
+regex_chars = re.compile(r'[\\()\[\]{}.*+?|$]')
+
+
+def split_segments(path):
+    return [segment for segment in path.split('/') if segment]
+
+
+def exit_segments(url):
+    # Path segments of a called url without scheme, host and query, formatted parts become wildcards
+    if not isinstance(url, str):
+        return list()
+    path = urlsplit(url).path if '://' in url else url.split('?', 1)[0]
+    segments = list()
+    for segment in split_segments(path):
+        segments.append(WILDCARD if format_field.search(segment) else segment)
+    return segments
+
+
+def route_segments(route):
+    # Segments of a Django route, regex routes (re_path, url) are told apart by their anchors
+    if not isinstance(route, str):
+        return list()
+    if route.startswith('^') or route.endswith('$'):
+        route = route.lstrip('^').rstrip('$')
+        segments = list()
+        for segment in split_segments(route):
+            segments.append(WILDCARD if regex_chars.search(segment) else segment)
+        return segments
+
+    segments = list()
+    for segment in split_segments(route):
+        segments.append(WILDCARD if path_converter.search(segment) else segment)
+    return segments
+
+
+def end_point_methods(point):
+    # HTTP methods of the view, None when it does not restrict them
+    if not point.http_methods:
+        return None
+    return {method.lower() for method in point.http_methods}
+
+
+class RouteNode:
+    __slots__ = ('children', 'wildcard', 'targets')
+
+    def __init__(self):
+        self.children = dict()
+        self.wildcard = None
+        self.targets = list()
+
+
+class RouteIndex:
+    # Trie over the route segments of every end point of a system
+    def __init__(self):
+        self.root = RouteNode()
+
+    def add(self, segments, target):
+        node = self.root
+        for segment in segments:
+            if segment == WILDCARD:
+                if node.wildcard is None:
+                    node.wildcard = RouteNode()
+                node = node.wildcard
+            else:
+                child = node.children.get(segment)
+                if child is None:
+                    child = node.children[segment] = RouteNode()
+                node = child
+        node.targets.append(target)
+
+    def match(self, segments):
+        # Targets whose route matches all the segments, literal children are tried before wildcards
+        found = list()
+        stack = [(self.root, 0)]
+        while stack:
+            node, position = stack.pop()
+            if position == len(segments):
+                found.extend(node.targets)
+                continue
+            segment = segments[position]
+            if node.wildcard is not None:
+                stack.append((node.wildcard, position + 1))
+            if segment != WILDCARD:
+                child = node.children.get(segment)
+                if child is not None:
+                    stack.append((child, position + 1))
+        return found
+
+    def lookup(self, segments, method=None):
+        # Tries the whole path first, then without its leading segments (gateway prefixes such as
+        # /api/v1) and finally with a trailing wildcard for urls built by concatenating a variable
+        if not segments:
+            # Urls that are not literals in the source cannot be matched
+            return list()
+        candidates = [segments[start:] for start in range(len(segments))]
+        for tail in (False, True):
+            for candidate in candidates:
+                if tail:
+                    candidate = candidate + [WILDCARD]
+                targets = [target for target in self.match(candidate) if accepts(target, method)]
+                if targets:
+                    return targets
+        return list()
+
+
+def accepts(target, method):
+    methods = target[2]
+    return methods is None or not method or method in methods
+
+
+def build_route_index(system):
+    index = RouteIndex()
+    for interface in system.interfaces:
+        for point in interface.end_points:
+            index.add(route_segments(point.path), (interface.name, point, end_point_methods(point)))
+    return index
+
+
+def build_graph(system):
+    # Links every exit point of a System to the end points it calls, each lookup walks the route trie
+    graph = Graph(system.name)
+    index = build_route_index(system)
+
+    for interface in system.interfaces:
+        graph.services.append(interface.name)
+        graph.adjacency[interface.name] = list()
+
+    for interface in system.interfaces:
+        targets = graph.adjacency[interface.name]
+        for point in interface.exit_points:
+            method = point.name.lower() if isinstance(point.name, str) else None
+            matches = index.lookup(exit_segments(point.path), method)
+            if not matches:
+                graph.unmatched.append(new_edge(interface.name, point, method))
+                continue
+
+            for service, end_point, methods in matches:
+                edge = new_edge(interface.name, point, method)
+                edge.target = service
+                edge.route = end_point.path
+                edge.target_func_name = end_point.func_name
+                edge.target_file_name = end_point.file_name
+                graph.edges.append(edge)
+                if service not in targets:
+                    targets.append(service)
+
+    return graph
+
+
+def new_edge(source, point, method):
+    edge = Edge()
+    edge.source = source
+    edge.method = method
+    edge.path = point.path
+    edge.func_name = point.func_name
+    edge.file_name = point.file_name
+    edge.line_no = point.line_no
+    return edge
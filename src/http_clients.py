@@ -0,0 +1,158 @@
+import hashlib
+import astroid
+from src.util import ast_walk
+
+HTTP_METHODS = ('get', 'post', 'put', 'patch', 'delete', 'head', 'options')
+
+
+class HttpClientRule:
+    # One HTTP client library: module level functions sending requests and client classes
+    # (sessions) whose methods send them. A verb of None means the method is the first argument
+    def __init__(self, module, functions=None, clients=(), methods=HTTP_METHODS,
+                 url_keyword='url', payload_keywords=('data', 'json')):
+        self.module = module
+        self.functions = functions or dict()
+        self.clients = clients
+        self.methods = methods
+        self.url_keyword = url_keyword
+        self.payload_keywords = payload_keywords
+
+    def call_rule(self, verb):
+        return CallRule(verb, self.url_keyword, self.payload_keywords)
+
+
+class CallRule:
+    def __init__(self, verb, url_keyword, payload_keywords):
+        self.verb = verb
+        self.url_keyword = url_keyword
+        self.payload_keywords = payload_keywords
+
+    def __repr__(self):
+        return 'CallRule({!r}, {!r}, {!r})'.format(self.verb, self.url_keyword, self.payload_keywords)
+
+
+def verb_functions(methods=HTTP_METHODS):
+    functions = {method: method for method in methods}
+    functions['request'] = None
+    return functions
+
+
+default_rules = [
+    HttpClientRule('requests', verb_functions(), clients=('Session', 'session')),
+    HttpClientRule('httpx', verb_functions(), clients=('Client', 'AsyncClient')),
+    HttpClientRule('aiohttp', clients=('ClientSession',)),
+    HttpClientRule('urllib.request', {'urlopen': 'get'}, payload_keywords=('data',)),
+]
+
+
+class HttpClientMatcher:
+    # Rules compiled into dispatch tables keyed by qualified call name, so matching a call is one
+    # dict lookup however many rules there are
+    def __init__(self, rules=None):
+        if rules is None:
+            rules = default_rules
+
+        self.calls = dict()
+        self.constructors = dict()
+        for rule in rules:
+            for name, verb in rule.functions.items():
+                self.calls[rule.module + '.' + name] = rule.call_rule(verb)
+
+            methods = {method: rule.call_rule(method) for method in rule.methods}
+            methods['request'] = rule.call_rule(None)
+            for client in rule.clients:
+                self.constructors[rule.module + '.' + client] = methods
+
+        # A file has to mention one of these to contain a matching call
+        self.trigger_names = sorted({rule.module.split('.')[0] for rule in rules})
+
+        signature = repr(sorted(self.calls.items())) + repr(sorted(
+            (name, sorted(methods.items())) for name, methods in self.constructors.items()))
+        self.fingerprint = hashlib.sha1(signature.encode()).hexdigest()[:12]
+
+    def find_calls(self, tree):
+        # Single walk: imports fill the alias table and client constructions the client variables
+        # before the calls that use them, each call is then resolved against the dispatch tables
+        aliases = dict()
+        clients = dict()
+        for node in ast_walk(tree):
+            if isinstance(node, astroid.Import):
+                for name, alias in node.names:
+                    if alias:
+                        aliases[alias] = name
+                    else:
+                        head = name.split('.')[0]
+                        aliases[head] = head
+
+            elif isinstance(node, astroid.ImportFrom):
+                if node.level:
+                    continue
+                for name, alias in node.names:
+                    aliases[alias or name] = node.modname + '.' + name
+
+            elif isinstance(node, astroid.Assign):
+                methods = self.client_methods(node.value, aliases)
+                if methods:
+                    for target in node.targets:
+                        target_name = dotted_name(target)
+                        if target_name:
+                            clients[target_name] = methods
+
+            elif isinstance(node, astroid.With):
+                for expr, variable in node.items:
+                    methods = self.client_methods(expr, aliases)
+                    if methods and variable is not None and dotted_name(variable):
+                        clients[dotted_name(variable)] = methods
+
+            elif isinstance(node, astroid.Call):
+                call_rule = self.match_call(node, aliases, clients)
+                if call_rule is not None:
+                    yield node, call_rule
+
+    def match_call(self, node, aliases, clients):
+        func = node.func
+        call_rule = self.calls.get(resolve_name(func, aliases))
+        if call_rule is not None:
+            return call_rule
+
+        if isinstance(func, astroid.Attribute):
+            methods = clients.get(dotted_name(func.expr))
+            if methods is None:
+                # Clients used without a variable, e.g. requests.Session().get(...)
+                methods = self.client_methods(func.expr, aliases)
+            if methods is not None:
+                return methods.get(func.attrname)
+        return None
+
+    def client_methods(self, node, aliases):
+        if isinstance(node, astroid.Await):
+            node = node.value
+        if isinstance(node, astroid.Call):
+            return self.constructors.get(resolve_name(node.func, aliases))
+        return None
+
+
+def dotted_name(node):
+    # 'a.b.c' for names and attribute chains (loads or stores), None for anything else
+    parts = list()
+    while isinstance(node, (astroid.Attribute, astroid.AssignAttr)):
+        parts.append(node.attrname)
+        node = node.expr
+    if not isinstance(node, (astroid.Name, astroid.AssignName)):
+        return None
+    parts.append(node.name)
+    return '.'.join(reversed(parts))
+
+
+def resolve_name(node, aliases):
+    # Qualified name of an imported callable, with the import alias of its head replaced
+    name = dotted_name(node)
+    if name is None:
+        return None
+    head, dot, rest = name.partition('.')
+    if head not in aliases:
+        return None
+    return aliases[head] + dot + rest
+
+
+default_matcher = HttpClientMatcher()
@@ -0,0 +1,169 @@
+import hashlib
+import os
+import os.path
+import threading
+from collections import OrderedDict
+from src.parser import parse_source_file, layout_system, process_regular_file, fill_module, check_projection
+from src.interface import service_interface
+from src.util import path_leaf
+from src.discovery import discover
+from src.registry import new_registry
+from src.nodes import System
+
+# Snapshots of previous analyses, keyed by analysis kind and project root (and projection for parses).
+# PYPARSER_SNAPSHOTS bounds their number, the least recently used ones are dropped first
+MAX_SNAPSHOTS = int(os.environ.get('PYPARSER_SNAPSHOTS', 16))
+
+snapshots = OrderedDict()
+# Only guards the snapshots dict, each snapshot has its own lock for the analysis
+snapshots_lock = threading.Lock()
+
+
+class Snapshot:
+    def __init__(self, result):
+        self.result = result
+        self.lock = threading.Lock()
+        self.manifest = dict()
+        self.modules = dict()
+        self.interfaces = dict()
+        self.file_points = dict()
+
+
+def build_manifest(index, previous=None):
+    # Maps service directories and python files to (mtime, size, hash), files whose
+    # mtime and size did not change keep their previous hash without being read
+    previous = previous or dict()
+    manifest = dict()
+
+    for entry in index.entries:
+        if entry.service is None:
+            continue
+
+        if entry.kind == 'dir':
+            manifest[entry.path] = (None, None, None)
+            continue
+        if not entry.name.endswith('.py'):
+            continue
+
+        known = previous.get(entry.path)
+        if known and known[0] == entry.mtime and known[1] == entry.size:
+            manifest[entry.path] = known
+            continue
+
+        with open(entry.path, 'rb') as source:
+            digest = hashlib.sha256(source.read()).hexdigest()
+        manifest[entry.path] = (entry.mtime, entry.size, digest)
+
+    return manifest
+
+
+def diff_manifests(old, new):
+    added = [path for path in new if path not in old]
+    deleted = [path for path in old if path not in new]
+    changed = [path for path in new if path in old and new[path][2] != old[path][2]]
+    return added, changed, deleted
+
+
+def get_snapshot(key, result=None):
+    with snapshots_lock:
+        snapshot = snapshots.get(key)
+        if snapshot is None:
+            snapshot = snapshots[key] = Snapshot(result)
+        snapshots.move_to_end(key)
+        # A snapshot dropped while it is in use is still updated by that call, it is just not kept
+        while len(snapshots) > MAX_SNAPSHOTS:
+            snapshots.popitem(last=False)
+        return snapshot
+
+
+def incremental_parse(file_name, projection='full', render=None):
+    # Same result as parse_source_file, only files changed since the last call are parsed again.
+    # The result is patched in place by later calls: render (e.g. the encoder) is called with it while
+    # the snapshot is locked and its return value is returned instead
+    check_projection(projection)
+    if not os.path.isdir(file_name):
+        result = parse_source_file(file_name, projection=projection)
+        return render(result) if render else result
+
+    snapshot = get_snapshot(('parse', os.path.normpath(file_name), projection))
+    with snapshot.lock:
+        index = discover(file_name)
+        manifest = build_manifest(index, snapshot.manifest)
+        added, changed, deleted = diff_manifests(snapshot.manifest, manifest)
+        changed = set(changed)
+
+        if snapshot.result is None or added or deleted:
+            # The tree layout changed, lay it out again and reuse every module that did not change
+            pending = list()
+            system = layout_system(file_name, pending, index, projection=projection)
+
+            modules = dict()
+            for module in pending:
+                parsed = snapshot.modules.get(module.full_name)
+                if parsed is None or module.full_name in changed:
+                    parsed = process_regular_file(module.full_name, projection=projection)
+                modules[module.full_name] = fill_module(module, parsed)
+
+            if snapshot.result is None:
+                snapshot.result = system
+            else:
+                snapshot.result.name = system.name
+                snapshot.result.apps = system.apps
+            snapshot.modules = modules
+
+        else:
+            for path in changed:
+                fill_module(snapshot.modules[path], process_regular_file(path, projection=projection))
+
+        snapshot.manifest = manifest
+        return render(snapshot.result) if render else snapshot.result
+
+
+def incremental_interfaces(file_name, project_name=None, render=None):
+    # Same result as system_interfaces, only services with changed files are analysed again.
+    # render works as for incremental_parse
+    if not project_name:
+        project_name = path_leaf(file_name)
+
+    snapshot = get_snapshot(('interface', os.path.normpath(file_name)), System())
+    with snapshot.lock:
+        index = discover(file_name)
+        manifest = build_manifest(index, snapshot.manifest)
+        added, changed, deleted = diff_manifests(snapshot.manifest, manifest)
+        touched = set(added + changed + deleted)
+        registry = new_registry()
+
+        interfaces = list()
+        file_points = dict()
+        known_interfaces = dict()
+        for service in index.services:
+            interface = snapshot.interfaces.get(service)
+            points = snapshot.file_points.get(service, dict())
+            service_touched = [path for path in touched if path.startswith(service + os.sep)]
+
+            if interface is None or service_touched:
+                for path in service_touched:
+                    points.pop(path, None)
+
+                interface = service_interface(service, points, index, registry)
+
+            interfaces.append(interface)
+            file_points[service] = points
+            known_interfaces[service] = interface
+
+        snapshot.result.name = project_name
+        snapshot.result.interfaces[:] = interfaces
+        snapshot.interfaces = known_interfaces
+        snapshot.file_points = file_points
+        snapshot.manifest = manifest
+        return render(snapshot.result) if render else snapshot.result
+
+
+def drop_snapshots(file_name=None):
+    with snapshots_lock:
+        if file_name is None:
+            snapshots.clear()
+            return
+        root = os.path.normpath(file_name)
+        for key in [key for key in snapshots if key[1] == root]:
+            del snapshots[key]
@@ -0,0 +1,134 @@
+import os
+import time
+import threading
+import weakref
+import astroid
+from astroid.context import InferenceContext
+from src import metrics
+
+# Seconds a single astroid inference may take, it also stops after InferenceContext.max_inferred nodes
+INFERENCE_TIME = float(os.environ.get('PYPARSER_INFERENCE_TIME', 0.25))
+
+# Returned for values that are not known statically
+UNKNOWN = object()
+
+# Memoized for values given up on because of the budget, they are UNKNOWN to callers
+EXHAUSTED = object()
+
+
+def literal_value(node):
+    # Constant folding of literals, f-strings and +/% of literals, without astroid inference
+    if isinstance(node, astroid.Const):
+        return node.value
+
+    if isinstance(node, astroid.JoinedStr):
+        parts = list()
+        for value in node.values:
+            if isinstance(value, astroid.Const):
+                parts.append(value.value)
+                continue
+            if not isinstance(value, astroid.FormattedValue) or value.format_spec is not None:
+                return UNKNOWN
+            inner = literal_value(value.value)
+            if inner is UNKNOWN:
+                return UNKNOWN
+            parts.append({114: repr, 97: ascii}.get(value.conversion, str)(inner))
+        return ''.join(parts)
+
+    if isinstance(node, astroid.BinOp) and node.op in ('+', '%'):
+        left = literal_value(node.left)
+        if left is UNKNOWN:
+            return UNKNOWN
+        if node.op == '%' and isinstance(node.right, astroid.Tuple):
+            right = tuple(literal_value(item) for item in node.right.elts)
+            if UNKNOWN in right:
+                return UNKNOWN
+        else:
+            right = literal_value(node.right)
+            if right is UNKNOWN:
+                return UNKNOWN
+        try:
+            if node.op == '+':
+                return left + right
+            if isinstance(left, str):
+                return left % right
+        except (TypeError, ValueError, OverflowError):
+            pass
+        return UNKNOWN
+
+    return UNKNOWN
+
+
+class InferenceBudget(list):
+    # Count of inferred nodes that astroid shares between the context passed to infer() and all its clones.
+    # Past the deadline it reads above InferenceContext.max_inferred, so astroid gives up at its next
+    # result with Uninferable. Nothing is raised inside astroid, which may be building a module at the time
+    def __init__(self, time_budget):
+        super().__init__([0])
+        self.deadline = time.perf_counter() + time_budget
+        self.exhausted = False
+
+    def __getitem__(self, index):
+        if not self.exhausted and time.perf_counter() > self.deadline:
+            self.exhausted = True
+        if self.exhausted:
+            return InferenceContext.max_inferred + 1
+        return list.__getitem__(self, index)
+
+
+class Inferrer:
+    # Values of astroid nodes: literals are folded directly, anything else is inferred by astroid within
+    # the time budget. Results are memoized per node for as long as its tree is alive
+    def __init__(self, time_budget=None):
+        self.time_budget = INFERENCE_TIME if time_budget is None else time_budget
+        self.memo = weakref.WeakKeyDictionary()
+        self.lock = threading.Lock()
+        self.stats = {'literals': 0, 'hits': 0, 'misses': 0, 'exhausted': 0, 'uninferable': 0}
+
+    def count(self, name):
+        with self.lock:
+            self.stats[name] += 1
+        metrics.count('inference.' + name)
+
+    def value(self, node, default=None):
+        result = literal_value(node)
+        if result is not UNKNOWN:
+            self.count('literals')
+            return result
+
+        try:
+            result = self.memo[node]
+            self.count('hits')
+            if result is EXHAUSTED:
+                # Counted on every lookup, callers check exhausted to know a result is incomplete
+                self.count('exhausted')
+        except KeyError:
+            self.count('misses')
+            with metrics.stage('inference'):
+                result = self.infer(node)
+            self.memo[node] = result
+        return default if result is UNKNOWN or result is EXHAUSTED else result
+
+    def infer(self, node):
+        # First inferred value of node as a Python constant, UNKNOWN when it has none and EXHAUSTED when
+        # it cannot be found in budget
+        budget = InferenceBudget(self.time_budget)
+        try:
+            inferred = next(node.infer(context=InferenceContext(nodes_inferred=budget)))
+        except (astroid.AstroidError, StopIteration, RecursionError):
+            inferred = None
+        if isinstance(inferred, astroid.Const):
+            return inferred.value
+        if budget.exhausted:
+            self.count('exhausted')
+            return EXHAUSTED
+        self.count('uninferable')
+        return UNKNOWN
+
+
+# Shared by every analysis of the process, memoized values go away with their trees
+inferrer = Inferrer()
+
+
+def infer_value(node, default=None):
+    return inferrer.value(node, default)
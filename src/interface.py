@@ -2,28 +2,105 @@ import os
 import os.path
 from src.exit_points import process_exit_points
 from src.entry_points import get_end_points
-from src.util import path_leaf, get_services
+from src.util import path_leaf, process_context
+from src.discovery import discover
+from src.registry import new_registry, module_cache
+from src.cache import get_cache, set_cache
 from src.nodes import System, Interface
 
 
-def system_interfaces(file_name, project_name=None):
+def system_interfaces(file_name, project_name=None, index=None, registry=None, progress=None, workers=None):
     if not project_name:
         project_name = path_leaf(file_name)
+    if index is None:
+        index = discover(file_name)
+    if registry is None:
+        registry = new_registry()
 
     #  get services
     system = System()
     system.name = project_name
 
-    for service in get_services(file_name):
-        interface = Interface(path_leaf(service))
+    if workers:
+        system.interfaces.extend(concurrent_interfaces(index, workers, progress))
+        return system
 
-        exit_points = process_exit_points(service)
-        end_points = get_end_points(service)
+    for service in index.services:
+        system.interfaces.append(service_interface(service, index=index, registry=registry, progress=progress))
 
-        interface.exit_points.extend(exit_points)
-        interface.end_points.extend(end_points)
+    return system
 
-        system.interfaces.append(interface)
 
-    return system
+def service_interface(service, file_points=None, index=None, registry=None, progress=None):
+    # A failing scan is recorded in the errors of the interface, as in concurrent mode
+    if registry is None:
+        registry = new_registry()
+    interface = Interface(path_leaf(service))
+    fill_interface(interface, [
+        ('exit_points', run_scan(process_exit_points, service, file_points, index, registry, progress)),
+        ('end_points', run_scan(get_end_points, service, registry, index)),
+    ])
+    return interface
+
+
+def fill_interface(interface, scans):
+    # scans are (stage, (points, error)) pairs as returned by run_scan
+    errors = list()
+    for stage, (points, error) in scans:
+        if error is None:
+            getattr(interface, stage).extend(points)
+        else:
+            errors.append('{}: {}'.format(stage, error))
+    if errors:
+        interface.errors = errors
+
+
+def concurrent_interfaces(index, workers, progress=None):
+    # Runs the exit point and end point scans of every service as separate tasks of a process pool.
+    # A failing scan is recorded in the errors of its interface instead of aborting the system.
+    # concurrent.futures.process pulls in multiprocessing, serial analyses never need it
+    from concurrent.futures import ProcessPoolExecutor
+
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=process_context(), initializer=set_cache,
+                                   initargs=(get_cache(),))
+    try:
+        scans = list()
+        for service in index.services:
+            service_index = index.subtree(service)
+            exit_scan = executor.submit(run_scan, process_exit_points, service, None, service_index)
+            end_scan = executor.submit(run_scan, get_end_points, service, None, service_index)
+            scans.append((service, exit_scan, end_scan))
+
+        interfaces = list()
+        for service, exit_scan, end_scan in scans:
+            interface = Interface(path_leaf(service))
+            fill_interface(interface, [('exit_points', scan_result(exit_scan)), ('end_points', scan_result(end_scan))])
+
+            if progress:
+                for entry in index.walk_files(service, '.py'):
+                    progress(entry.path)
+            interfaces.append(interface)
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+    return interfaces
+
+
+def scan_result(future):
+    try:
+        return future.result()
+    except Exception as error:
+        # The pool itself failed (a worker died)
+        return None, '{}: {}'.format(type(error).__name__, error)
+
 
+def run_scan(scan, *args):
+    # A failing scan returns its message instead of raising. In a worker this also matters because
+    # exceptions such as astroid's cannot be unpickled and would break the whole pool
+    try:
+        return scan(*args), None
+    except Exception as error:
+        return None, '{}: {}'.format(type(error).__name__, error)
+    finally:
+        # Modules the scan's inference imported
+        module_cache.trim_astroid()
@@ -0,0 +1,152 @@
+import json
+import os
+import os.path
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from src.parser import parse_source_file
+from src.interface import system_interfaces
+
+
+class JobCancelled(BaseException):
+    # Raised from the progress callback. Not an Exception, so that the analysis does not record it as
+    # the failure of a scan
+    pass
+
+
+class QueueFull(Exception):
+    pass
+
+
+def run_parse(file_name, options, progress):
+    return parse_source_file(file_name, workers=options.get('workers'), progress=progress,
+                             projection=options.get('projection', 'full'))
+
+
+def run_interface(file_name, options, progress):
+    return system_interfaces(file_name, options.get('projectName'), progress=progress, workers=options.get('workers'))
+
+
+job_kinds = {
+    'parse': run_parse,
+    'interface': run_interface,
+}
+
+
+class Job:
+    def __init__(self, kind, file_name, options):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.file_name = file_name
+        self.options = options
+        self.status = 'queued'
+        self.files_done = 0
+        self.services = dict()
+        self.result = None
+        self.error = None
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.cancel_requested = threading.Event()
+
+    def report(self, file_name):
+        # Progress callback handed to the analysis, it is also where cancellation takes effect
+        if self.cancel_requested.is_set():
+            raise JobCancelled()
+
+        service = os.path.relpath(file_name, self.file_name).split(os.sep)[0]
+        self.services[service] = self.services.get(service, 0) + 1
+        self.files_done += 1
+
+    def done(self):
+        return self.status in ('done', 'failed', 'cancelled')
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'fileName': self.file_name,
+            'status': self.status,
+            'filesProcessed': self.files_done,
+            'services': dict(self.services),
+            'error': self.error,
+            'submitted': self.submitted,
+            'started': self.started,
+            'finished': self.finished,
+        }
+
+
+class JobManager:
+    # Runs analyses in a bounded pool; identical submissions share the job still pending or running
+    def __init__(self, workers=2, max_queued=16, max_finished=64):
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.max_queued = max_queued
+        self.max_finished = max_finished
+        self.jobs = dict()
+        self.active = dict()
+        self.lock = threading.Lock()
+
+    def submit(self, kind, file_name, options=None):
+        if kind not in job_kinds:
+            raise ValueError('Unknown job kind: {}'.format(kind))
+
+        options = options or dict()
+        key = (kind, os.path.normpath(file_name), json.dumps(options, sort_keys=True))
+        with self.lock:
+            job = self.active.get(key)
+            if job is not None and not job.cancel_requested.is_set():
+                return job
+
+            queued = sum(1 for job in self.active.values() if job.status == 'queued')
+            if queued >= self.max_queued:
+                raise QueueFull()
+
+            job = Job(kind, file_name, options)
+            self.jobs[job.id] = job
+            self.active[key] = job
+            self.prune()
+
+        self.executor.submit(self.run, job, key)
+        return job
+
+    def run(self, job, key):
+        try:
+            if job.cancel_requested.is_set():
+                raise JobCancelled()
+            job.status = 'running'
+            job.started = time.time()
+            job.result = job_kinds[job.kind](job.file_name, job.options, job.report)
+            job.status = 'done'
+        except JobCancelled:
+            job.status = 'cancelled'
+        except Exception as error:
+            job.error = '{}: {}'.format(type(error).__name__, error)
+            job.status = 'failed'
+        finally:
+            job.finished = time.time()
+            with self.lock:
+                if self.active.get(key) is job:
+                    del self.active[key]
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is not None and not job.done():
+            job.cancel_requested.set()
+        return job
+
+    def prune(self):
+        # Forgets the oldest finished jobs (and their results) beyond max_finished
+        finished = [job for job in self.jobs.values() if job.done()]
+        finished.sort(key=lambda job: job.finished)
+        for job in finished[:max(0, len(finished) - self.max_finished)]:
+            del self.jobs[job.id]
+
+
+job_manager = JobManager(
+    workers=int(os.environ.get('PYPARSER_JOB_WORKERS', 2)),
+    max_queued=int(os.environ.get('PYPARSER_JOB_QUEUE', 16)),
+)
@@ -1,17 +1,26 @@
-from src.util import get_files
+from src.discovery import iter_files
 import os
 
-def getLanguage(file_name):
+def getLanguage(file_name, index=None):
     if os.path.isfile(file_name):
         return parseFileEnding(file_name)
 
     else:
-        for file in get_files(file_name):
-            val = getLanguage(file)
+        # Without an index the walk stops at the first file with a known ending
+        if index is None:
+            paths = iter_files(file_name, hidden=False)
+        else:
+            paths = (entry.path for entry in index.files()
+                     if not is_hidden(os.path.relpath(entry.path, file_name)))
+        for path in paths:
+            val = parseFileEnding(path)
             if val is not None:
                 return val
         return None
 
+def is_hidden(relative_path):
+    return any(part.startswith('.') for part in relative_path.split(os.sep))
+
 def parseFileEnding(fileName):
     if fileName.endswith('.py'):
         return 'python'
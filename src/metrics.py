@@ -0,0 +1,146 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# PYPARSER_METRICS=on measures every request, otherwise only the requests asking for it are measured
+ENABLED = os.environ.get('PYPARSER_METRICS', 'off').lower() in ('1', 'on', 'true', 'yes')
+# Directory the .prof files of profiled requests are written to, if set
+PROFILE_DIR = os.environ.get('PYPARSER_PROFILE_DIR')
+
+current = ContextVar('pyparser_metrics', default=None)
+
+
+class Metrics:
+    # Time spent and calls per stage, counters and time per file of one request (or of the process)
+    def __init__(self):
+        self.stages = dict()
+        self.counters = dict()
+        self.files = dict()
+        self.profile = None
+        self.lock = threading.Lock()
+
+    def add_time(self, name, seconds, file_name=None):
+        with self.lock:
+            stage = self.stages.get(name)
+            if stage is None:
+                stage = self.stages[name] = [0, 0.0]
+            stage[0] += 1
+            stage[1] += seconds
+            if file_name is not None:
+                self.files[file_name] = self.files.get(file_name, 0.0) + seconds
+
+    def add_count(self, name, amount=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def merge(self, other):
+        with self.lock:
+            for name, (calls, seconds) in other.stages.items():
+                stage = self.stages.setdefault(name, [0, 0.0])
+                stage[0] += calls
+                stage[1] += seconds
+            for name, amount in other.counters.items():
+                self.counters[name] = self.counters.get(name, 0) + amount
+            for file_name, seconds in other.files.items():
+                self.files[file_name] = self.files.get(file_name, 0.0) + seconds
+            if other.profile is not None:
+                self.profile = other.profile
+
+    def to_dict(self, files=10, profile=False):
+        with self.lock:
+            slowest = sorted(self.files.items(), key=lambda item: item[1], reverse=True)[:files]
+            result = {
+                'stages': {name: {'calls': calls, 'seconds': round(seconds, 6)}
+                           for name, (calls, seconds) in self.stages.items()},
+                'counters': dict(self.counters),
+                'slowest_files': [{'file_name': file_name, 'seconds': round(seconds, 6)}
+                                  for file_name, seconds in slowest],
+            }
+            if profile and self.profile is not None:
+                result['profile'] = self.profile
+        return result
+
+
+# Totals over every measured request, served by /metrics
+process_metrics = Metrics()
+
+
+class NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+null_stage = NullStage()
+
+
+class Stage:
+    __slots__ = ('metrics', 'name', 'file_name', 'start')
+
+    def __init__(self, metrics, name, file_name):
+        self.metrics = metrics
+        self.name = name
+        self.file_name = file_name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self.metrics.add_time(self.name, time.perf_counter() - self.start, self.file_name)
+        return False
+
+
+def stage(name, file_name=None):
+    # with stage('astroid.parse', path): ... ; a shared no-op when nothing is being measured
+    metrics = current.get()
+    if metrics is None:
+        return null_stage
+    return Stage(metrics, name, file_name)
+
+
+def count(name, amount=1):
+    metrics = current.get()
+    if metrics is not None:
+        metrics.add_count(name, amount)
+
+
+def active():
+    return current.get() is not None
+
+
+@contextmanager
+def collecting(metrics=None):
+    # Measures the code run inside the block (in this thread) into metrics
+    if metrics is None:
+        metrics = Metrics()
+    token = current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        current.reset(token)
+
+
+@contextmanager
+def profiling(metrics, limit=30, dump_name=None):
+    # cProfile capture of the block, the top functions by cumulative time are kept as text in metrics
+    import cProfile
+    import io
+    import pstats
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        if dump_name and PROFILE_DIR:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            profiler.dump_stats(os.path.join(PROFILE_DIR, dump_name + '.prof'))
+        output = io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(limit)
+        metrics.profile = output.getvalue()
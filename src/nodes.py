@@ -1,11 +1,37 @@
-class PySystem:
+import sys
+
+
+class Node:
+    # Parse tree nodes keep their fields in __slots__; the state is a plain dict so
+    # jsonpickle and pickle still see the same fields as a regular object
+    __slots__ = ()
+
+    def __getstate__(self):
+        state = dict()
+        for slot in self.__slots__:
+            if hasattr(self, slot):
+                state[slot] = getattr(self, slot)
+        return state
+
+    def __setstate__(self, state):
+        for key, value in state.items():
+            if type(value) is str:
+                value = sys.intern(value)
+            setattr(self, key, value)
+
+
+class PySystem(Node):
+    __slots__ = ('name', 'apps', 'type')
+
     def __init__(self, name):
         self.name = name
         self.apps = list()
         self.type = 'system'
 
 
-class PyApp:
+class PyApp(Node):
+    __slots__ = ('name', 'modules', 'packages', 'type')
+
     def __init__(self, name):
         self.name = name
         self.modules = list()
@@ -13,7 +39,9 @@ class PyApp:
         self.type = 'app'
 
 
-class PyModule:
+class PyModule(Node):
+    __slots__ = ('name', 'full_name', 'relative_name', 'imports', 'classes', 'functions', 'statements', 'type')
+
     def __init__(self):
         self.name = ''
         self.full_name = ''
@@ -25,7 +53,9 @@ class PyModule:
         self.type = 'module'
 
 
-class PyPackage:
+class PyPackage(Node):
+    __slots__ = ('name', 'modules', 'packages', 'type', 'relative_name', 'full_name')
+
     def __init__(self):
         self.name = ''
         self.modules = list()
@@ -33,13 +63,17 @@ class PyPackage:
         self.type = 'package'
 
 
-class PyImport:
+class PyImport(Node):
+    __slots__ = ('name', 'type')
+
     def __init__(self):
         self.name = ''
         self.type = 'import'
 
 
-class PyClass:
+class PyClass(Node):
+    __slots__ = ('name', 'imports', 'bases', 'classes', 'functions', 'statements', 'component_type', 'type')
+
     def __init__(self):
         self.name = ''
         self.imports = list()
@@ -51,14 +85,18 @@ class PyClass:
         self.type = 'class'
 
 
-class PyBase:
+class PyBase(Node):
+    __slots__ = ('name', 'value', 'type')
+
     def __init__(self):
         self.name = ''
         self.value = ''
         self.type = 'base_class'
 
 
-class PyFunction:
+class PyFunction(Node):
+    __slots__ = ('name', 'args', 'imports', 'classes', 'functions', 'statements', 'component_type', 'type')
+
     def __init__(self):
         self.name = ''
         self.args = list()
@@ -70,7 +108,9 @@ class PyFunction:
         self.type = 'function'
 
 
-class PyCall:
+class PyCall(Node):
+    __slots__ = ('statement_type', 'func', 'args', 'keywords', 'type')
+
     def __init__(self):
         self.statement_type = 'function_call'
         self.func = ''
@@ -79,14 +119,18 @@ class PyCall:
         self.type = 'statement_function_call'
 
 
-class PyName:
+class PyName(Node):
+    __slots__ = ('statement_type', 'name', 'type')
+
     def __init__(self):
         self.statement_type = ''
         self.name = ''
         self.type = 'statement_assign'
 
 
-class PyArgCall:
+class PyArgCall(Node):
+    __slots__ = ('statements', 'type')
+
     def __init__(self):
         self.statements = list()
         self.type = 'arg_call'
@@ -94,6 +138,10 @@ class PyArgCall:
 
 # Interface Nodes
 class Point:
+    # HTTP methods an end point answers, only set on an instance when its view restricts them, so that
+    # other points keep the fields jsonpickle used to serialize
+    http_methods = None
+
     def __init__(self):
         self.name = None
         self.func_name = None
@@ -119,7 +167,34 @@ class System:
 
 
 class Interface:
+    # Only set on an instance when a scan of the service failed, so that interfaces without
+    # errors keep the fields jsonpickle used to serialize
+    errors = ()
+
     def __init__(self, name):
         self.name = name
         self.end_points = list()
-        self.exit_points = list()
\ No newline at end of file
+        self.exit_points = list()
+
+
+class Graph:
+    def __init__(self, name):
+        self.name = name
+        self.services = list()
+        self.edges = list()
+        self.unmatched = list()
+        self.adjacency = dict()
+
+
+class Edge:
+    def __init__(self):
+        self.source = None
+        self.target = None
+        self.method = None
+        self.path = None
+        self.route = None
+        self.func_name = None
+        self.file_name = None
+        self.line_no = None
+        self.target_func_name = None
+        self.target_file_name = None
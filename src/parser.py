@@ -1,10 +1,13 @@
 import ast
 import os
-import tempfile
 from enum import Enum
-from urllib.parse import urlparse
-from src.nodes import *
-from src.util import path_leaf, get_services
+from itertools import repeat
+from src.nodes import PySystem, PyApp, PyPackage, PyModule, PyImport, PyClass, PyBase, PyFunction, PyCall, \
+    PyName, PyArgCall
+from src.util import path_leaf, process_context
+from src.discovery import discover
+from src.cache import get_cache, set_cache
+from src import metrics
 
 
 class NodeType(Enum):
@@ -14,6 +17,11 @@ class NodeType(Enum):
     STATEMENTS = 'statements'
 
 
+# How much of each module /parse extracts: imports only, imports with classes and functions, or
+# everything including the call and name statements
+PROJECTIONS = ('imports', 'structure', 'full')
+
+
 class ComponentType(Enum):
     VIEW = 'view'
     TEMPLATE = 'template'
@@ -25,26 +33,59 @@ class ComponentType(Enum):
     GENERIC = 'generic'
 
 
-def parse_source_file(file_name):
+def parse_source_file(file_name, workers=None, chunk_size=None, index=None, progress=None, projection='full'):
+    # progress is called with the path of every module once it has been parsed
+    check_projection(projection)
     # If url, process url first
     # if urlparse(file_name).scheme in ('http', 'https'):
     #     return process_url(file_name)
 
     # if file path determine if single file or directory
     if os.path.isfile(file_name):
-        return process_regular_file(file_name)
+        return parse_single_file(file_name, projection)
 
     # if directory go through all files recursively
     if os.path.isdir(file_name):
-        project_name = path_leaf(file_name)
-        system = PySystem(project_name)
-        # TODO get all apps and loop for each app
-        for service in get_services(file_name):
-            py_app = PyApp(path_leaf(service))
-            system.apps.append(process_directory(py_app, service, service))
+        # In parallel mode the walk only lays out the tree, modules are parsed afterwards
+        pending = list() if workers else None
+        system = layout_system(file_name, pending, index, progress, projection)
+
+        if pending:
+            parse_pending_modules(pending, workers, chunk_size, progress, projection)
         return system
 
 
+def parse_single_file(file_name, projection='full'):
+    # A file given instead of a project, named like the modules of a project with the file as its root
+    module_node = process_regular_file(file_name, projection=projection)
+    if module_node is not None:
+        module_node.name = path_leaf(file_name)
+        module_node.relative_name = module_node.name
+        module_node.full_name = file_name
+    return module_node
+
+
+def check_projection(projection):
+    if projection not in PROJECTIONS:
+        raise ValueError('Unknown projection {!r}, expected one of {}'.format(projection, ', '.join(PROJECTIONS)))
+
+
+def layout_system(file_name, pending=None, index=None, progress=None, projection='full'):
+    # Builds the system tree; with a pending list modules are left empty and collected there
+    if index is None:
+        index = discover(file_name)
+
+    project_name = path_leaf(file_name)
+    system = PySystem(project_name)
+
+    # TODO get all apps and loop for each app
+    for service in index.services:
+        py_app = PyApp(path_leaf(service))
+        system.apps.append(process_directory(py_app, service, service, pending, index, progress, projection))
+
+    return system
+
+
 # def process_url(git_url):
 #     # Download the project locally
 #     with tempfile.TemporaryDirectory() as temp_dirname:
@@ -53,43 +94,149 @@ def parse_source_file(file_name):
 #         return parse_source_file(temp_dirname, git_url.rsplit('/', 1)[-1])
 
 
-def process_regular_file(file_name):
+def process_regular_file(file_name, registry=None, projection='full'):
     if not file_name.endswith('.py'):
         return None
 
-    with open(file_name, "r") as source:
-        tree = ast.parse(source.read())
+    if registry is not None:
+        data = registry.source(file_name)
+    else:
+        with metrics.stage('read', file_name), open(file_name, "rb") as source:
+            data = source.read()
+        metrics.count('files')
+        metrics.count('bytes', len(data))
+
+    # Unchanged files are served from the parse cache without running ast.parse
+    cache = get_cache()
+    key = cache.key('module' if projection == 'full' else 'module-' + projection, data)
+    module = cache.get(key)
+    if module is not None:
+        metrics.count('cache.hits')
+        return module
+    metrics.count('cache.misses')
+
+    if registry is not None:
+        tree = registry.ast_tree(file_name)
+    else:
+        with metrics.stage('ast.parse', file_name):
+            tree = ast.parse(data)
+        if metrics.active():
+            metrics.count('nodes', sum(1 for _ in ast.walk(tree)))
+    with metrics.stage('analyze', file_name):
+        module = parse_node(tree, PyModule(), projection)
+    cache.put(key, module)
+    return module
+
+
+def process_directory(app_node, root_name, file_path, pending=None, index=None, progress=None, projection='full'):
+    if index is None:
+        index = discover(file_path)
+
+    for entry in index.list_dir(file_path):
+        full_name = entry.path
+        simple_name = os.path.relpath(full_name, root_name)
+        short_name = entry.name
+
+        if entry.kind == 'file' and short_name.endswith('.py'):
+            if pending is None:
+                module_node = process_regular_file(full_name, projection=projection)
+                if progress:
+                    progress(full_name)
+            else:
+                module_node = PyModule()
+                pending.append(module_node)
+            module_node.name = short_name
+            module_node.relative_name = simple_name
+            module_node.full_name = full_name
+            app_node.modules.append(module_node)
 
-    module = PyModule()
-    return parse_node(tree, module)
+        elif entry.kind == 'dir':
+            package_node = PyPackage()
+            process_directory(package_node, root_name, full_name, pending, index, progress, projection)
+            package_node.name = short_name
+            package_node.relative_name = simple_name
+            package_node.full_name = full_name
+            app_node.packages.append(package_node)
+
+    return app_node
 
 
-def process_directory(app_node, root_name, file_path):
-    for file in os.listdir(file_path):
-        full_name = os.path.join(file_path, file)
+def iter_source_file(file_name, index=None, projection='full'):
+    # Streaming counterpart of parse_source_file, yields the system, apps, packages and
+    # modules one by one (each with its app) as soon as they are built, without keeping the tree
+    check_projection(projection)
+    if os.path.isfile(file_name):
+        # A single file is parsed as one module, like parse_source_file does
+        module_node = parse_single_file(file_name, projection)
+        if module_node is not None:
+            yield None, module_node
+        return
+
+    if index is None:
+        index = discover(file_name)
+
+    yield None, PySystem(path_leaf(file_name))
+    for service in index.services:
+        py_app = PyApp(path_leaf(service))
+        yield py_app, py_app
+        for node in iter_directory(service, service, index, projection):
+            yield py_app, node
+
+
+def iter_directory(root_name, file_path, index, projection='full'):
+    for entry in index.list_dir(file_path):
+        full_name = entry.path
         simple_name = os.path.relpath(full_name, root_name)
-        short_name = file
+        short_name = entry.name
 
-        if os.path.isfile(full_name) and file.endswith('.py'):
-            module_node = process_regular_file(full_name)
+        if entry.kind == 'file' and short_name.endswith('.py'):
+            module_node = process_regular_file(full_name, projection=projection)
             module_node.name = short_name
             module_node.relative_name = simple_name
             module_node.full_name = full_name
-            app_node.modules.append(module_node)
+            yield module_node
 
-        elif os.path.isdir(full_name):
+        elif entry.kind == 'dir':
             package_node = PyPackage()
-
-            # TODO: Ignore some files, may be using project's git ignore
-            # if simple_name not in files_to_ignore:
-
-            process_directory(package_node, root_name, full_name)
             package_node.name = short_name
             package_node.relative_name = simple_name
             package_node.full_name = full_name
-            app_node.packages.append(package_node)
+            yield package_node
+            yield from iter_directory(root_name, full_name, index, projection)
 
-    return app_node
+
+def parse_pending_modules(modules, workers, chunk_size=None, progress=None, projection='full'):
+    # Parses the modules laid out by process_directory across a process pool
+    if not chunk_size:
+        chunk_size = max(1, len(modules) // (workers * 4))
+
+    # concurrent.futures.process pulls in multiprocessing, serial parses never need it
+    from concurrent.futures import ProcessPoolExecutor
+
+    file_names = [module.full_name for module in modules]
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=process_context(), initializer=set_cache,
+                                   initargs=(get_cache(),))
+    try:
+        parsed_modules = executor.map(process_regular_file, file_names, repeat(None), repeat(projection),
+                                      chunksize=chunk_size)
+        for module, parsed in zip(modules, parsed_modules):
+            fill_module(module, parsed)
+            if progress:
+                progress(module.full_name)
+    finally:
+        # Drops the chunks not started yet when progress aborts the parse
+        executor.shutdown(cancel_futures=True)
+
+    return modules
+
+
+def fill_module(module, parsed):
+    # Copies the parsed contents into a module laid out by process_directory
+    module.imports = parsed.imports
+    module.classes = parsed.classes
+    module.functions = parsed.functions
+    module.statements = parsed.statements
+    return module
 
 
 def raw_source_file(file_name):
@@ -99,8 +246,8 @@ def raw_source_file(file_name):
     return tree
 
 
-def parse_node(ast_node, node):
-    analyzer = Analyzer(node)
+def parse_node(ast_node, node, projection='full'):
+    analyzer = analyzers[projection](node)
     analyzer.visit(ast_node)
     return analyzer.module
 
@@ -137,21 +284,43 @@ def set_func_component_type(node):
 
 
 class Analyzer(ast.NodeVisitor):
+    # One visitor per tree: classes, functions and call arguments push their node on the scope stack
+    # while their children are visited, everything found is added to the innermost scope
+    dispatch = dict()
+
     def __init__(self, module):
         self.module = module
+        self.scopes = [module]
+
+    def visit(self, ast_node):
+        # Visitor methods are looked up once per node type instead of once per node
+        node_type = type(ast_node)
+        method = self.dispatch.get(node_type)
+        if method is None:
+            analyzer_type = type(self)
+            method = getattr(analyzer_type, 'visit_' + node_type.__name__, analyzer_type.generic_visit)
+            self.dispatch[node_type] = method
+        return method(self, ast_node)
+
+    def visit_scope(self, node, ast_nodes):
+        self.scopes.append(node)
+        for ast_child_node in ast_nodes:
+            self.visit(ast_child_node)
+        self.scopes.pop()
 
     def visit_Import(self, ast_node):
-        print(self.module.name)
+        imports = self.scopes[-1].imports
         for alias in ast_node.names:
             imp = PyImport()
             imp.name = alias.name
-            self.module.imports.append(imp)
+            imports.append(imp)
 
     def visit_ImportFrom(self, ast_node):
+        imports = self.scopes[-1].imports
         for alias in ast_node.names:
             imp = PyImport()
             imp.name = alias.name
-            self.module.imports.append(imp)
+            imports.append(imp)
 
     def visit_ClassDef(self, ast_node):
         node = PyClass()
@@ -168,11 +337,11 @@ class Analyzer(ast.NodeVisitor):
 
             node.bases.append(base_node)
 
-        for ast_child_node in ast_node.body:
-            parse_node(ast_child_node, node)
+        scope = self.scopes[-1]
+        self.visit_scope(node, ast_node.body)
 
         set_class_component_type(node)
-        self.module.classes.append(node)
+        scope.classes.append(node)
 
     def visit_FunctionDef(self, ast_node):
         node = PyFunction()
@@ -183,11 +352,11 @@ class Analyzer(ast.NodeVisitor):
 
         # node['returns'] = ast_node.returns
 
-        for ast_child_node in ast_node.body:
-            parse_node(ast_child_node, node)
+        scope = self.scopes[-1]
+        self.visit_scope(node, ast_node.body)
 
         set_func_component_type(node)
-        self.module.functions.append(node)
+        scope.functions.append(node)
 
     def visit_Call(self, ast_node):
         node = PyCall()
@@ -203,17 +372,18 @@ class Analyzer(ast.NodeVisitor):
                 node.args.append(arg.id)
             elif isinstance(arg, ast.Call):
                 call_dict = PyArgCall()
-                parse_node(arg, call_dict)
+                self.visit_scope(call_dict, (arg,))
                 node.args.append(call_dict)
-            elif isinstance(arg, ast.Num):
-                node.args.append(arg.n)
-            elif isinstance(arg, ast.Str):
-                node.args.append(arg.s)
+            elif isinstance(arg, ast.Constant):
+                # Numbers (not booleans) and strings
+                value = arg.value
+                if isinstance(value, (int, float, complex, str)) and not isinstance(value, bool):
+                    node.args.append(value)
 
         for keyword in ast_node.keywords:
             node.keywords.append(keyword.arg)
 
-        self.module.statements.append(node)
+        self.scopes[-1].statements.append(node)
 
     def visit_Name(self, ast_node):
         node = PyName()
@@ -227,4 +397,38 @@ class Analyzer(ast.NodeVisitor):
         elif isinstance(ctx, ast.Del):
             node.statement_type = 'Del'
 
-        self.module.statements.append(node)
+        self.scopes[-1].statements.append(node)
+
+
+# Nodes holding the statement lists that structure projections descend into
+block_types = tuple(getattr(ast, name) for name in ('stmt', 'excepthandler', 'match_case') if hasattr(ast, name))
+
+
+class StructureAnalyzer(Analyzer):
+    # Only follows statement lists, so expressions (and their calls and names) are never visited
+    dispatch = dict()
+
+    def generic_visit(self, ast_node):
+        for field in ast_node._fields:
+            value = getattr(ast_node, field, None)
+            if type(value) is list and value and isinstance(value[0], block_types):
+                for ast_child_node in value:
+                    self.visit(ast_child_node)
+
+
+class ImportsAnalyzer(StructureAnalyzer):
+    # Module level imports only, classes and functions are skipped with their bodies
+    dispatch = dict()
+
+    def visit_ClassDef(self, ast_node):
+        pass
+
+    def visit_FunctionDef(self, ast_node):
+        pass
+
+
+analyzers = {
+    'imports': ImportsAnalyzer,
+    'structure': StructureAnalyzer,
+    'full': Analyzer,
+}
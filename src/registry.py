@@ -0,0 +1,218 @@
+import ast
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+import astroid
+from src import metrics
+from src.util import ast_walk
+
+# PYPARSER_SHARED_MODULES=on keeps parsed modules between requests
+SHARE_MODULES = os.environ.get('PYPARSER_SHARED_MODULES', 'off').lower() in ('1', 'on', 'true', 'yes')
+
+# Process wide astroid trees: PYPARSER_MODULE_CACHE=off disables them, PYPARSER_MODULE_CACHE_SIZE is the
+# memory ceiling in bytes
+MODULE_CACHE = os.environ.get('PYPARSER_MODULE_CACHE', 'on').lower() in ('1', 'on', 'true', 'yes')
+MODULE_CACHE_SIZE = int(os.environ.get('PYPARSER_MODULE_CACHE_SIZE', 256 * 1024 * 1024))
+
+# Modules astroid imports itself while inferring stay in astroid.MANAGER.astroid_cache, which has no limit.
+# PYPARSER_ASTROID_MODULES is the number kept, the oldest are dropped past it
+ASTROID_MODULES = int(os.environ.get('PYPARSER_ASTROID_MODULES', 2000))
+# astroid reads builtins from its cache directly, it is never dropped
+ASTROID_PINNED = ('builtins',)
+
+# Memory taken by an astroid tree, measured at 20 to 75 bytes per byte of source
+TREE_OVERHEAD = 4096
+TREE_BYTES_PER_SOURCE_BYTE = 40
+
+
+class ModuleCache:
+    # astroid trees keyed by path and content hash, least recently used trees are evicted past max_size.
+    # A path seen with new content drops its previous tree
+    def __init__(self, max_size=MODULE_CACHE_SIZE, enabled=MODULE_CACHE):
+        self.max_size = max_size
+        self.enabled = enabled
+        self.trees = OrderedDict()
+        self.paths = dict()
+        self.size = 0
+        self.lock = threading.Lock()
+        self.counters = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0, 'astroid_evictions': 0}
+
+    def astroid_tree(self, path, data):
+        if not self.enabled:
+            tree = parse_astroid(path, data)
+            self.trim_astroid()
+            return tree
+
+        key = (path, hashlib.sha1(data).hexdigest())
+        with self.lock:
+            entry = self.trees.get(key)
+            if entry is not None:
+                self.trees.move_to_end(key)
+                self.counters['hits'] += 1
+                metrics.count('module_cache.hits')
+                return entry[0]
+
+        # Parsed outside the lock, two threads may parse the same module and keep the last one
+        tree = parse_astroid(path, data)
+        tree_size = TREE_OVERHEAD + TREE_BYTES_PER_SOURCE_BYTE * len(data)
+        with self.lock:
+            self.counters['misses'] += 1
+            metrics.count('module_cache.misses')
+            previous = self.paths.get(path)
+            if previous is not None and previous != key and previous in self.trees:
+                self.size -= self.trees.pop(previous)[1]
+                self.counters['invalidations'] += 1
+            if key in self.trees:
+                self.size -= self.trees.pop(key)[1]
+
+            if tree_size <= self.max_size:
+                self.trees[key] = (tree, tree_size)
+                self.paths[path] = key
+                self.size += tree_size
+                self.evict()
+        self.trim_astroid()
+        return tree
+
+    def evict(self):
+        while self.size > self.max_size and self.trees:
+            (path, digest), (tree, tree_size) = self.trees.popitem(last=False)
+            self.size -= tree_size
+            if self.paths.get(path) == (path, digest):
+                del self.paths[path]
+            self.counters['evictions'] += 1
+
+    def trim_astroid(self):
+        # Runs after every parse and every interface scan. astroid also caches the first tree of
+        # astroid.parse under the name '', which would keep it alive after it leaves this cache.
+        # Other threads may import while this runs, the names are copied before iterating
+        cache = astroid.MANAGER.astroid_cache
+        cache.pop('', None)
+        if len(cache) <= ASTROID_MODULES:
+            return
+        with self.lock:
+            names = [name for name in list(cache) if name not in ASTROID_PINNED]
+            for name in names[:len(cache) - ASTROID_MODULES]:
+                cache.pop(name, None)
+                self.counters['astroid_evictions'] += 1
+            # Inference results hold nodes of the dropped modules
+            astroid.context._invalidate_cache()
+
+    def clear(self):
+        with self.lock:
+            self.trees.clear()
+            self.paths.clear()
+            self.size = 0
+            for name in list(astroid.MANAGER.astroid_cache):
+                if name not in ASTROID_PINNED:
+                    astroid.MANAGER.astroid_cache.pop(name, None)
+            astroid.context._invalidate_cache()
+
+    def to_dict(self):
+        with self.lock:
+            result = dict(self.counters)
+            result.update({
+                'enabled': self.enabled,
+                'modules': len(self.trees),
+                'size': self.size,
+                'max_size': self.max_size,
+                # Modules astroid loaded itself while inferring imports, bounded by ASTROID_MODULES
+                'astroid_modules': len(astroid.MANAGER.astroid_cache),
+                'max_astroid_modules': ASTROID_MODULES,
+            })
+        return result
+
+
+def parse_astroid(path, data):
+    with metrics.stage('astroid.parse', path):
+        tree = astroid.parse(data.decode())
+    if metrics.active():
+        metrics.count('nodes', sum(1 for _ in ast_walk(tree)))
+    return tree
+
+
+module_cache = ModuleCache()
+
+
+class ModuleRegistry:
+    # Reads and parses each file at most once, every consumer gets the same source and trees.
+    # Without keep_trees the trees are not stored: astroid trees come from module_cache, which bounds
+    # their memory, and ast trees are parsed again
+    def __init__(self, parent=None, validate=False, keep_trees=True):
+        self.parent = parent
+        self.validate = validate
+        self.keep_trees = keep_trees
+        self.stats = dict()
+        self.sources = dict()
+        self.ast_trees = dict()
+        self.astroid_trees = dict()
+
+    def source(self, path):
+        path = os.path.normpath(path)
+        if self.validate:
+            self.check(path)
+
+        if path not in self.sources:
+            if self.parent is not None:
+                self.sources[path] = self.parent.source(path)
+            else:
+                with metrics.stage('read', path), open(path, 'rb') as source:
+                    self.sources[path] = source.read()
+                metrics.count('files')
+                metrics.count('bytes', len(self.sources[path]))
+        return self.sources[path]
+
+    def ast_tree(self, path):
+        path = os.path.normpath(path)
+        data = self.source(path)
+        if not self.keep_trees:
+            return self.parse_ast(path, data)
+        if path not in self.ast_trees:
+            if self.parent is not None:
+                self.ast_trees[path] = self.parent.ast_tree(path)
+            else:
+                self.ast_trees[path] = self.parse_ast(path, data)
+        return self.ast_trees[path]
+
+    def parse_ast(self, path, data):
+        with metrics.stage('ast.parse', path):
+            tree = ast.parse(data)
+        if metrics.active():
+            metrics.count('nodes', sum(1 for _ in ast.walk(tree)))
+        return tree
+
+    def astroid_tree(self, path):
+        path = os.path.normpath(path)
+        data = self.source(path)
+        if not self.keep_trees:
+            return module_cache.astroid_tree(path, data)
+        if path not in self.astroid_trees:
+            if self.parent is not None:
+                self.astroid_trees[path] = self.parent.astroid_tree(path)
+            else:
+                self.astroid_trees[path] = module_cache.astroid_tree(path, data)
+        return self.astroid_trees[path]
+
+    def check(self, path):
+        # Forgets a file whose mtime or size changed since it was read
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if self.stats.get(path) != signature:
+            self.forget(path)
+            self.stats[path] = signature
+
+    def forget(self, path):
+        self.sources.pop(path, None)
+        self.ast_trees.pop(path, None)
+        self.astroid_trees.pop(path, None)
+
+
+# Only keeps the sources between requests, the trees are bounded by module_cache
+shared_registry = ModuleRegistry(validate=True, keep_trees=False)
+
+
+def new_registry(shared=None):
+    # Registry for one request, backed by the process wide one when modules are shared
+    if shared is None:
+        shared = SHARE_MODULES
+    return ModuleRegistry(parent=shared_registry if shared else None)
@@ -0,0 +1,249 @@
+"""
+Binary snapshots of parse and interface results.
+
+A snapshot holds the same document as the JSON output in a string-table based layout that can be
+memory-mapped and navigated lazily: only the values that are accessed get decoded.
+
+Layout (little-endian):
+    header   magic, version, string count, string table offset, root value offset
+    values   tag byte followed by its payload; lists store the offsets of their items and
+             dicts (keys sorted) store (key string index, value offset) pairs
+    strings  count + 1 offsets into the utf-8 blob that follows them
+"""
+
+import mmap
+import struct
+from collections.abc import Mapping, Sequence
+from src.encoder import encode_value
+
+MAGIC = b'PYPSNAP\0'
+VERSION = 1
+
+HEADER = struct.Struct('<8sIIII')
+U32 = struct.Struct('<I')
+I64 = struct.Struct('<q')
+F64 = struct.Struct('<d')
+PAIR = struct.Struct('<II')
+
+NONE, FALSE, TRUE, INT, FLOAT, STR, LIST, DICT, BIG_INT = range(9)
+
+
+class SnapshotWriter:
+    def __init__(self):
+        self.buffer = bytearray(HEADER.size)
+        self.strings = dict()
+
+    def string(self, value):
+        index = self.strings.get(value)
+        if index is None:
+            index = self.strings[value] = len(self.strings)
+        return index
+
+    def offset(self):
+        offset = len(self.buffer)
+        if offset > 0xFFFFFFFF:
+            raise ValueError('Snapshot exceeds 4 GiB')
+        return offset
+
+    def write(self, value):
+        # Children are written before their container, returns the offset of the value
+        value_type = type(value)
+        if value_type is list:
+            items = [self.write(item) for item in value]
+            offset = self.offset()
+            self.buffer.append(LIST)
+            self.buffer += U32.pack(len(items))
+            self.buffer += struct.pack('<{}I'.format(len(items)), *items)
+            return offset
+
+        if value_type is dict:
+            pairs = [(self.string(key), self.write(value[key])) for key in sorted(value)]
+            offset = self.offset()
+            self.buffer.append(DICT)
+            self.buffer += U32.pack(len(pairs))
+            for pair in pairs:
+                self.buffer += PAIR.pack(*pair)
+            return offset
+
+        offset = self.offset()
+        if value is None:
+            self.buffer.append(NONE)
+        elif value is False:
+            self.buffer.append(FALSE)
+        elif value is True:
+            self.buffer.append(TRUE)
+        elif value_type is int and -2 ** 63 <= value < 2 ** 63:
+            self.buffer.append(INT)
+            self.buffer += I64.pack(value)
+        elif value_type is int:
+            self.buffer.append(BIG_INT)
+            self.buffer += U32.pack(self.string(str(value)))
+        elif value_type is float:
+            self.buffer.append(FLOAT)
+            self.buffer += F64.pack(value)
+        elif value_type is str:
+            self.buffer.append(STR)
+            self.buffer += U32.pack(self.string(value))
+        else:
+            raise TypeError('Cannot store {!r} in a snapshot'.format(value_type))
+        return offset
+
+    def finish(self, root):
+        strings_offset = self.offset()
+        blobs = [value.encode('utf-8', 'surrogatepass') for value in self.strings]
+        position = 0
+        offsets = [position]
+        for blob in blobs:
+            position += len(blob)
+            offsets.append(position)
+
+        self.buffer += struct.pack('<{}I'.format(len(offsets)), *offsets)
+        self.buffer += b''.join(blobs)
+        HEADER.pack_into(self.buffer, 0, MAGIC, VERSION, len(blobs), strings_offset, root)
+        return bytes(self.buffer)
+
+
+def dumps_snapshot(node):
+    # Snapshot bytes for a PySystem, System or any node the encoder knows
+    writer = SnapshotWriter()
+    root = writer.write(encode_value(node))
+    return writer.finish(root)
+
+
+def dump_snapshot(node, file_name):
+    with open(file_name, 'wb') as target:
+        target.write(dumps_snapshot(node))
+
+
+class SnapshotFile:
+    # Read side of a snapshot, backed by a memory map (or any buffer)
+    def __init__(self, data, source=None):
+        self.data = data
+        self.source = source
+        magic, version, count, strings_offset, root = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('Not a py-parser snapshot')
+
+        self.string_count = count
+        self.string_offsets = strings_offset
+        self.string_blob = strings_offset + (count + 1) * U32.size
+        self.string_cache = dict()
+        self.root_offset = root
+
+    @property
+    def root(self):
+        return self.value(self.root_offset)
+
+    def string(self, index):
+        value = self.string_cache.get(index)
+        if value is None:
+            start, end = struct.unpack_from('<II', self.data, self.string_offsets + index * U32.size)
+            value = str(self.data[self.string_blob + start:self.string_blob + end], 'utf-8', 'surrogatepass')
+            self.string_cache[index] = value
+        return value
+
+    def value(self, offset):
+        tag = self.data[offset]
+        if tag == NONE:
+            return None
+        if tag == FALSE:
+            return False
+        if tag == TRUE:
+            return True
+        if tag == INT:
+            return I64.unpack_from(self.data, offset + 1)[0]
+        if tag == FLOAT:
+            return F64.unpack_from(self.data, offset + 1)[0]
+        if tag == STR:
+            return self.string(U32.unpack_from(self.data, offset + 1)[0])
+        if tag == BIG_INT:
+            return int(self.string(U32.unpack_from(self.data, offset + 1)[0]))
+        if tag == LIST:
+            return SnapshotList(self, offset)
+        if tag == DICT:
+            return SnapshotDict(self, offset)
+        raise ValueError('Corrupt snapshot at offset {}'.format(offset))
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        if self.source is not None:
+            self.source.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class SnapshotList(Sequence):
+    def __init__(self, snapshot, offset):
+        self.snapshot = snapshot
+        self.offset = offset
+        self.length = U32.unpack_from(snapshot.data, offset + 1)[0]
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.length))]
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError(index)
+        item = U32.unpack_from(self.snapshot.data, self.offset + 5 + index * U32.size)[0]
+        return self.snapshot.value(item)
+
+
+class SnapshotDict(Mapping):
+    def __init__(self, snapshot, offset):
+        self.snapshot = snapshot
+        self.offset = offset
+        self.length = U32.unpack_from(snapshot.data, offset + 1)[0]
+
+    def pair(self, index):
+        return PAIR.unpack_from(self.snapshot.data, self.offset + 5 + index * PAIR.size)
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        for index in range(self.length):
+            yield self.snapshot.string(self.pair(index)[0])
+
+    def __getitem__(self, key):
+        # Keys are stored sorted, so look them up by bisection
+        low, high = 0, self.length
+        while low < high:
+            middle = (low + high) // 2
+            key_index, value_offset = self.pair(middle)
+            middle_key = self.snapshot.string(key_index)
+            if middle_key == key:
+                return self.snapshot.value(value_offset)
+            if middle_key < key:
+                low = middle + 1
+            else:
+                high = middle
+        raise KeyError(key)
+
+
+def load_snapshot(file_name):
+    # Memory maps a snapshot file, values are decoded as they are accessed
+    source = open(file_name, 'rb')
+    data = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+    return SnapshotFile(data, source)
+
+
+def loads_snapshot(data):
+    return SnapshotFile(data)
+
+
+def to_python(value):
+    # Fully decodes a lazy snapshot value into dicts and lists
+    if isinstance(value, SnapshotDict):
+        return {key: to_python(item) for key, item in value.items()}
+    if isinstance(value, SnapshotList):
+        return [to_python(item) for item in value]
+    return value
@@ -0,0 +1,258 @@
+import os
+import astroid
+from src.discovery import discover
+from src.registry import ModuleRegistry
+from src.inference import infer_value
+
+# Names django.urls (and the older django.conf.urls) use for url patterns and includes
+pattern_functions = ('path', 're_path', 'url')
+include_functions = ('include',)
+
+
+class Definition:
+    # Top level binding of a module: a node defined there, or a name imported from another module
+    def __init__(self, node, module_name, imported=None):
+        self.node = node
+        self.module_name = module_name
+        self.imported = imported
+
+
+class SymbolIndex:
+    # Maps the dotted module names of a service to their files, and each module to its top level
+    # definitions. A module is parsed the first time one of its names is looked up, then every
+    # lookup is a dict access
+    def __init__(self, service_path, registry=None, index=None):
+        if registry is None:
+            registry = ModuleRegistry()
+        if index is None:
+            index = discover(service_path)
+
+        self.root = service_path
+        self.registry = registry
+        self.modules = dict()
+        self.packages = set()
+        self.symbols = dict()
+
+        for entry in index.walk_files(service_path, '.py'):
+            relative = os.path.relpath(entry.path, service_path)
+            parts = relative[:-len('.py')].split(os.sep)
+            if parts[-1] == '__init__':
+                parts.pop()
+                self.packages.add('.'.join(parts))
+            if parts:
+                self.modules['.'.join(parts)] = os.path.normpath(entry.path)
+
+    def module_path(self, module_name):
+        return self.modules.get(module_name)
+
+    def module_tree(self, module_name):
+        path = self.modules.get(module_name)
+        if path is None:
+            return None
+        return self.registry.astroid_tree(path)
+
+    def definitions(self, module_name):
+        if module_name not in self.symbols:
+            # Registered before it is filled so that cyclic star imports terminate
+            definitions = self.symbols[module_name] = dict()
+            self.collect_definitions(module_name, definitions)
+        return self.symbols[module_name]
+
+    def collect_definitions(self, module_name, definitions):
+        tree = self.module_tree(module_name)
+        if tree is None:
+            return
+
+        for node in tree.body:
+            if isinstance(node, (astroid.FunctionDef, astroid.ClassDef)):
+                definitions[node.name] = Definition(node, module_name)
+            elif isinstance(node, astroid.Assign):
+                for target in node.targets:
+                    if isinstance(target, astroid.AssignName):
+                        definitions[target.name] = Definition(node, module_name)
+            elif isinstance(node, astroid.Import):
+                for name, alias in node.names:
+                    if alias:
+                        definitions[alias] = Definition(node, module_name, (name, None))
+                    else:
+                        head = name.split('.')[0]
+                        definitions[head] = Definition(node, module_name, (head, None))
+            elif isinstance(node, astroid.ImportFrom):
+                source = self.absolute_name(module_name, node.modname, node.level)
+                if source is None:
+                    continue
+                for name, alias in node.names:
+                    if name == '*':
+                        for star_name, star in self.definitions(source).items():
+                            definitions.setdefault(star_name, star)
+                    else:
+                        definitions[alias or name] = Definition(node, module_name, (source, name))
+
+    def absolute_name(self, module_name, target, level):
+        # Dotted name of an import target as seen from module_name
+        if not level:
+            return target
+        package = module_name.split('.') if module_name in self.packages else module_name.split('.')[:-1]
+        if level > 1:
+            if level - 1 > len(package):
+                return None
+            package = package[:len(package) - (level - 1)]
+        return '.'.join(package + ([target] if target else []))
+
+    def resolve(self, module_name, name):
+        # Follows imports to the module defining name, returns a Definition, a module name or None
+        seen = set()
+        while (module_name, name) not in seen:
+            seen.add((module_name, name))
+            definition = self.definitions(module_name).get(name)
+            if definition is None:
+                # Submodules are attributes of their package
+                submodule = module_name + '.' + name if module_name else name
+                return submodule if submodule in self.modules else None
+            if definition.imported is None:
+                return definition
+
+            source, source_name = definition.imported
+            if source_name is None:
+                return source if source in self.modules else None
+            module_name, name = source, source_name
+        return None
+
+    def resolve_expr(self, module_name, node):
+        # Resolves a Name or an attribute chain used in module_name
+        if isinstance(node, astroid.Name):
+            return self.resolve(module_name, node.name)
+        if isinstance(node, astroid.Attribute):
+            owner = self.resolve_expr(module_name, node.expr)
+            if isinstance(owner, str):
+                return self.resolve(owner, node.attrname)
+            if isinstance(owner, Definition) and isinstance(owner.node, astroid.ClassDef):
+                for child in owner.node.body:
+                    if isinstance(child, astroid.FunctionDef) and child.name == node.attrname:
+                        return Definition(child, owner.module_name)
+        return None
+
+
+class UrlPattern:
+    # A url pattern of the service with the routes of its includes prepended
+    def __init__(self, route, view, module_name, name=None, as_view=False):
+        self.route = route
+        self.view = view
+        self.module_name = module_name
+        self.name = name
+        self.as_view = as_view
+
+
+def call_name(node):
+    func = node.func
+    if isinstance(func, astroid.Name):
+        return func.name
+    if isinstance(func, astroid.Attribute):
+        return func.attrname
+    return None
+
+
+def const_value(node):
+    # Literal strings, or constants the bounded inference can find
+    return infer_value(node)
+
+
+def join_route(prefix, route):
+    # Regex routes anchor every level with ^, only the outermost one is kept
+    if prefix and route.startswith('^'):
+        route = route[1:]
+    return prefix + route
+
+
+def pattern_elements(symbols, module_name):
+    # Elements of the urlpatterns list(s) of a module, including `urlpatterns += [...]`
+    tree = symbols.module_tree(module_name)
+    if tree is None:
+        return
+    for node in tree.body:
+        if isinstance(node, astroid.Assign):
+            if any(isinstance(target, astroid.AssignName) and target.name == 'urlpatterns'
+                   for target in node.targets):
+                yield from sequence_elements(node.value)
+        elif isinstance(node, astroid.AugAssign):
+            if isinstance(node.target, astroid.AssignName) and node.target.name == 'urlpatterns':
+                yield from sequence_elements(node.value)
+
+
+def sequence_elements(node):
+    if isinstance(node, (astroid.List, astroid.Tuple)):
+        yield from node.elts
+    elif isinstance(node, astroid.BinOp) and node.op == '+':
+        yield from sequence_elements(node.left)
+        yield from sequence_elements(node.right)
+
+
+def resolve_urlpatterns(symbols, module_name, prefix='', seen=None):
+    # Every url pattern reachable from a urlconf, in declaration order, following include()
+    if seen is None:
+        seen = set()
+    if module_name in seen:
+        return list()
+    seen = seen | {module_name}
+    return resolve_elements(symbols, module_name, pattern_elements(symbols, module_name), prefix, seen)
+
+
+def resolve_elements(symbols, module_name, elements, prefix, seen):
+    patterns = list()
+    for element in elements:
+        if not isinstance(element, astroid.Call) or call_name(element) not in pattern_functions:
+            continue
+        if len(element.args) < 2:
+            continue
+        route = const_value(element.args[0])
+        if not isinstance(route, str):
+            continue
+        route = join_route(prefix, route)
+        view = element.args[1]
+
+        if isinstance(view, astroid.Call) and call_name(view) in include_functions:
+            patterns.extend(resolve_include(symbols, module_name, view, route, seen))
+            continue
+
+        name = None
+        for keyword in element.keywords or ():
+            if keyword.arg == 'name':
+                name = const_value(keyword.value)
+
+        as_view = False
+        if isinstance(view, astroid.Call) and isinstance(view.func, astroid.Attribute) \
+                and view.func.attrname == 'as_view':
+            # Class based view, ViewClass.as_view(...)
+            view = view.func.expr
+            as_view = True
+
+        definition = symbols.resolve_expr(module_name, view)
+        if isinstance(definition, Definition) and \
+                isinstance(definition.node, (astroid.FunctionDef, astroid.ClassDef)):
+            patterns.append(UrlPattern(route, definition.node, definition.module_name, name, as_view))
+    return patterns
+
+
+def resolve_include(symbols, module_name, include, route, seen):
+    if not include.args:
+        return list()
+    target = include.args[0]
+    if isinstance(target, astroid.Tuple) and target.elts:
+        # include((patterns, app_name))
+        target = target.elts[0]
+
+    if isinstance(target, astroid.List):
+        return resolve_elements(symbols, module_name, target.elts, route, seen)
+
+    # include(app.urls) with the module imported, or a pattern list defined elsewhere
+    resolved = symbols.resolve_expr(module_name, target)
+    if isinstance(resolved, str):
+        return resolve_urlpatterns(symbols, resolved, route, seen)
+    if isinstance(resolved, Definition) and isinstance(resolved.node, astroid.Assign) \
+            and isinstance(resolved.node.value, (astroid.List, astroid.Tuple, astroid.BinOp)):
+        return resolve_elements(symbols, resolved.module_name, sequence_elements(resolved.node.value), route, seen)
+
+    included = const_value(target)
+    if isinstance(included, str):
+        return resolve_urlpatterns(symbols, included, route, seen)
+    return list()
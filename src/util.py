@@ -1,11 +1,42 @@
 import ntpath
-import os
+from src.discovery import discover
 
 
 def ast_walk(root):
-    yield root
-    for node in root.get_children():
-        yield from ast_walk(node)
+    # Pre-order walk over an explicit stack, children are pushed reversed to come out in source order
+    stack = [root]
+    pop = stack.pop
+    extend = stack.extend
+    while stack:
+        node = pop()
+        yield node
+        children = list(node.get_children())
+        children.reverse()
+        extend(children)
+
+
+def ast_walk_types(root, types):
+    # Same walk, only yielding the nodes that are instances of types
+    stack = [root]
+    pop = stack.pop
+    extend = stack.extend
+    while stack:
+        node = pop()
+        if isinstance(node, types):
+            yield node
+        children = list(node.get_children())
+        children.reverse()
+        extend(children)
+
+
+def process_context():
+    # Start method of the worker pools: a fork of the threaded server could copy a lock held by another
+    # thread (module cache, metrics, inference) into the worker, locked forever.
+    # multiprocessing is only imported here, serial analyses never need it
+    import multiprocessing
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('forkserver')
+    return multiprocessing.get_context('spawn')
 
 
 def path_leaf(path):
@@ -18,17 +49,8 @@ def path_base(path):
     return head
 
 def get_services(project_path):
-    for name in os.listdir(project_path):
-        if not name.startswith('.'):
-            name = os.path.join(project_path, name)
-            if os.path.isdir(name):
-                yield name
+    yield from discover(project_path).services
 
 def get_files(project_path):
-    for name in os.listdir(project_path):
-        if not name.startswith('.'):
-            name = os.path.join(project_path, name)
-            if os.path.isdir(name):
-                yield from get_files(name)
-            else:
-                yield name
\ No newline at end of file
+    for entry in discover(project_path).files():
+        yield entry.path
\ No newline at end of file